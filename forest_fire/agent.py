@@ -0,0 +1,37 @@
+import contextlib
+
+
+class CellAgent:
+    """
+    Base dos agentes do modelo, com `__slots__` e sem um `__dict__` por agente.
+
+    Não herda de `mesa.Agent`, que não declara `__slots__` (e daria um `__dict__` a toda subclasse):
+    reproduz só o que o mesa usa dos agentes, isto é, `unique_id`, `model` e `pos`, o registro em
+    `model.agents_`, `remove`, `step`, `advance` e `random`. O slot `__weakref__` é necessário
+    porque o `AgentSet` do agendador guarda referências fracas.
+
+    Constantes de cada classe (status fixo, `burnable`...) são atributos da classe, e as do bioma
+    são lidas do modelo.
+    """
+    __slots__ = ("unique_id", "model", "pos", "__weakref__")
+
+    def __init__(self, unique_id: int, model):
+        self.unique_id = unique_id
+        self.model = model
+        self.pos = None
+        model.agents_[type(self)][self] = None
+
+    def remove(self):
+        """Tira o agente do registro do modelo."""
+        with contextlib.suppress(KeyError):
+            self.model.agents_[type(self)].pop(self)
+
+    def step(self):
+        pass
+
+    def advance(self):
+        pass
+
+    @property
+    def random(self):
+        return self.model.random
@@ -0,0 +1,364 @@
+import multiprocessing
+
+import mesa
+import numpy as np
+from typing import Literal
+from forest_fire.biome import biomes
+from forest_fire import landscape, spread, checkpoint, dispatch, ignition
+from forest_fire.seeds import seed_random
+from forest_fire.headless import HeadlessRun
+from forest_fire.profiling import StepProfiler, PHASES_TABLE, PHASES_COLUMNS
+from forest_fire.spread import MOORE, neighbor_sum
+from forest_fire.neighbourhood import FIRST_LEVEL_DIRECTIONS, SECOND_LEVEL_DIRECTIONS
+from forest_fire.clusters import BurnClusters
+from forest_fire.landscape import GROUND, EMPTY, FINE, BURNING, BURNED
+
+
+class ForestFireArray(HeadlessRun, mesa.Model):
+    '''
+    Versão do `ForestFire` em que o estado das células fica em arrays do NumPy, em vez de um
+    agente do mesa por célula. Recebe os mesmos parâmetros e coleta as mesmas colunas.
+
+    Cada array tem formato (width, height) e é indexado por [x, y], como o `MultiGrid`:
+        - terrain: GROUND, LAKE, CORRIDOR ou OBSTACLE
+        - status: EMPTY, FINE, BURNING ou BURNED
+        - size, CO2_emission, CO2_sequestered: dados da árvore da célula
+    Nuvens e bombeiros, que são poucos e se movem, ficam em arrays de posições.
+
+    Com `tiles` > 1, a propagação do fogo e a reprodução são feitas em paralelo, por faixas do grid
+    em processos separados, com o mesmo resultado (ver tiles.py). `close` encerra esses processos.
+    Num processo de um `Pool`, que não pode criar processos, `tiles` é ignorado.
+    '''
+    def __init__(
+        self,
+        biome_name: Literal["Default"],
+        width=100,
+        height=100,
+        rainy_season=False,
+        imagens=False,
+        cloud_quantity=0,
+        fireman_quantity=0,
+        cloud_step=15,
+        clouds_per_step=1,
+        clouds_size=3,
+        tree_density=0.65,
+        random_fire = True,
+        position_fire = "Top",
+        water_density=0.15,
+        num_of_lakes=1,
+        corridor_density=0.15,
+        obstacles_density=0.15,
+        obstacles=True,
+        corridor=True,
+        individual_lakes=True,
+        reprod_speed=1,
+        wind_direction="N",
+        wind_intensity=0.5,
+        weighted_ignition=False,
+        tiles=1,
+        debug=False,
+        profile=False,
+        seed=None
+    ):
+        super().__init__()
+        seed_random(self, seed)
+
+        self.biome = biomes[biome_name]
+        self.width = width
+        self.height = height
+        self.random_fire = random_fire
+        self.position_fire = position_fire
+        self.tree_density = self.biome.density if tree_density == 0 else tree_density
+        self.rainy_season = rainy_season
+        self.cloud_quantity = cloud_quantity
+        self.fireman_quantity = fireman_quantity
+        self.cloud_step = cloud_step
+        self.clouds_per_step = clouds_per_step
+        self.clouds_size = clouds_size
+        self.reprod_speed = reprod_speed
+        self.water_density = water_density
+        self.num_of_lakes = num_of_lakes
+        self.corridor_density = corridor_density
+        self.corridor_radius = self.biome.corridor_radius
+        self.obstacles_density = obstacles_density
+        self.obstacles = obstacles
+        self.corridor = corridor
+        self.individual_lakes = individual_lakes
+        self.wind_direction = wind_direction
+        self.wind_intensity = wind_intensity
+        self.weighted_ignition = weighted_ignition
+        self.tiles = tiles
+        self.debug = debug # Sem efeito: as contagens já são feitas direto nos arrays
+        self.profiler = StepProfiler(profile)
+
+        # O agendador não tem agentes: só conta os passos (usado pelo `batch_run`)
+        self.schedule = mesa.time.BaseScheduler(self)
+
+        self.terrain, self.status, self.size = landscape.generate(self, self.rng)
+        self.clusters = BurnClusters(self.width, self.height)  # Áreas queimadas contínuas (ver clusters.py)
+        self.clusters.update(self.status == BURNING)
+        self.CO2_emission = np.zeros((width, height))
+        self.CO2_sequestered = np.zeros((width, height))
+        self._tile_pool = None
+        self._start_tiles()
+
+        # Número de vizinhos dentro do grid, usado na reprodução
+        ones = np.ones((width, height))
+        self.n_first_level = neighbor_sum(ones, FIRST_LEVEL_DIRECTIONS)
+        self.n_second_level = neighbor_sum(ones, SECOND_LEVEL_DIRECTIONS)
+
+        # Nuvens: posição, direção e tamanho
+        self.cloud_pos = np.zeros((0, 2), dtype=int)
+        self.cloud_direction = np.zeros((0, 2))
+        self.cloud_size = np.zeros(0, dtype=int)
+        # Bombeiros: posição
+        self.fireman_pos = np.zeros((0, 2), dtype=int)
+
+        self._init_collection()
+        self.datacollector = self._make_datacollector()
+
+        if rainy_season:
+            self._initialize_clouds(cloud_quantity)
+        self._initialize_firemen(fireman_quantity)
+
+        self.collect()
+
+    def _make_datacollector(self):
+        return mesa.DataCollector(
+            model_reporters=self._selected_reporters({
+                # Contagens como int do Python, para serem serializadas em JSON pela visualização
+                "Fine": lambda model: int(np.count_nonzero(model.status == FINE)),
+                "Burning": lambda model: int(np.count_nonzero(model.status == BURNING)),
+                "Burned": lambda model: int(np.count_nonzero(model.status == BURNED)),
+                "Terra": lambda model: int(np.count_nonzero((model.status == EMPTY) & (model.terrain == GROUND))),
+                "Total": lambda model: int(np.count_nonzero(model.status)),
+                "Clouds": lambda model: len(model.cloud_size),
+                "CO2(Kg)": lambda model: model.count_CO2(model),
+                "Fire fronts": lambda model: model.clusters.fronts,
+                "Largest burned patch": lambda model: model.clusters.largest,
+                "Spanning": lambda model: model.clusters.spanning,
+            }),
+            tables={PHASES_TABLE: PHASES_COLUMNS}
+        )
+
+    def __getstate__(self):
+        """Estado para o checkpoint (ver checkpoint.py): do coletor de dados, guarda só o histórico."""
+        state = self.__dict__.copy()
+        state["datacollector"] = checkpoint.collected_data(self.datacollector)
+        state["schedule"] = (self.schedule.steps, self.schedule.time)
+        state["_tile_pool"] = None  # Os arrays são gravados como cópias; os processos são recriados
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.datacollector = self._make_datacollector()
+        checkpoint.restore_collected_data(self.datacollector, state["datacollector"])
+        self.schedule = mesa.time.BaseScheduler(self)
+        self.schedule.steps, self.schedule.time = state["schedule"]
+        self.tiles = state.get("tiles", 1)
+        self._start_tiles()
+
+    def _start_tiles(self):
+        '''
+        Inicia os processos das faixas do grid, com `tiles` > 1 (ver tiles.py). Dentro de um processo
+        de um `Pool` (varreduras, explorador de percolação), que não pode criar processos, o modelo
+        roda num só processo, com o mesmo resultado.
+        '''
+        if self.tiles > 1 and not multiprocessing.current_process().daemon:
+            from forest_fire.tiles import TilePool
+
+            self._tile_pool = TilePool(self, self.tiles)
+
+    def close(self):
+        '''Encerra os processos das faixas do grid, se houver.'''
+        if self._tile_pool is not None:
+            self._tile_pool.close()
+            self._tile_pool = None
+
+    def save_checkpoint(self, path: str):
+        """Grava o estado completo do modelo, para continuar a simulação depois com `checkpoint.load`."""
+        checkpoint.save(self, path)
+
+    def _initialize_clouds(self, cloud_count):
+        """Inicializa nuvens no grid com tamanhos e posições aleatórias."""
+        pos = np.column_stack([self.rng.integers(0, self.width, cloud_count),
+                               self.rng.integers(0, self.height, cloud_count)])
+        direction = np.tile(np.array(self._get_wind_vector(), dtype=float), (cloud_count, 1))
+        size = self.rng.integers(1, self.clouds_size, cloud_count, endpoint=True)
+        self.cloud_pos = np.concatenate([self.cloud_pos, pos])
+        self.cloud_direction = np.concatenate([self.cloud_direction, direction])
+        self.cloud_size = np.concatenate([self.cloud_size, size])
+
+    def _initialize_firemen(self, fireman_quantity=0):
+        """Inicializa os bombeiros em células aleatórias (toda célula tem terra)."""
+        self.fireman_pos = np.column_stack([self.rng.integers(0, self.width, fireman_quantity),
+                                            self.rng.integers(0, self.height, fireman_quantity)])
+
+    def _random_fire(self):
+        '''
+        Inicia focos de incêndio em até 8 células de terra vazias ou com árvores saudáveis (ver ignition.py).
+        '''
+        cells = ignition.ignition_points(self.rng, self.biome, self.width, self.height, self.weighted_ignition,
+                                         (self.status == FINE).ravel(), lambda cell: self.size.flat[cell])
+        xs, ys = np.divmod(np.array(cells, dtype=int), self.height)
+        ignitable = (self.terrain[xs, ys] == GROUND) & np.isin(self.status[xs, ys], (EMPTY, FINE))
+        xs, ys = xs[ignitable], ys[ignitable]
+        new_trees = self.status[xs, ys] == EMPTY
+        self.size[xs[new_trees], ys[new_trees]] = self.biome.size.sample(self.rng, np.count_nonzero(new_trees))
+        self.status[xs, ys] = BURNING
+
+    def _in_grid(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def propagate_fire(self):
+        '''
+        Propagação do fogo influenciada pelo vento, como em `ForestFire.propagate_fire`.
+        '''
+        if self._tile_pool is not None:
+            self._tile_pool.propagate_fire(self.rng)
+            return
+        spread.wind_spread(self.status, self.size, self.CO2_emission,
+                           self._get_wind_vector(), self.wind_intensity, self.rng)
+
+    def spread_fire(self):
+        '''
+        Propagação do fogo de `Tree.step`, aplicada a todas as árvores em chamas de uma vez.
+        '''
+        if self._tile_pool is not None:
+            self._tile_pool.spread_fire()
+            return
+        spread.spread(self.status, self.terrain, self.size, self.CO2_emission, self.corridor_radius)
+
+    def reproduce(self):
+        '''
+        Reprodução das árvores (ver `Tree.tree_reproduction`), feita para todo o grid de uma vez.
+        Cada árvore saudável abaixo da densidade esperada tenta crescer árvores nas células vazias ou
+        queimadas da sua vizinhança; as árvores queimadas que não rebrotam viram terra.
+        '''
+        if self._tile_pool is not None:
+            self._tile_pool.reproduce(self.rng, self.biome.size)
+            return
+        t1, t2, sources = spread.reproduction_sources(self.status, self.n_first_level, self.n_second_level,
+                                                      self.tree_density)
+        if not sources.any():
+            return
+        grow, cleared = spread.regrowth(self.status, self.terrain, self.n_first_level, self.n_second_level,
+                                        t1, t2, sources, self.tree_density, self.reprod_speed,
+                                        self.rng.random(sources.shape))
+
+        self.status[cleared] = EMPTY
+        self.size[cleared] = 0
+        self.CO2_emission[cleared | grow] = 0
+        self.status[grow] = FINE
+        self.size[grow] = self.biome.size.sample(self.rng, np.count_nonzero(grow))
+
+    def step_clouds(self):
+        '''
+        Move as nuvens, faz chover nas cheias e funde as vizinhas (ver `Cloud.step`).
+        '''
+        alive = np.ones(len(self.cloud_size), dtype=bool)
+        for i in self.rng.permutation(len(self.cloud_size)):
+            if not alive[i]:
+                continue
+            x, y = self.cloud_pos[i]
+            if x == 0 or x == self.width - 1 or y == 0 or y == self.height - 1:
+                alive[i] = False
+                continue
+
+            dx, dy = self.cloud_direction[i]
+            self.cloud_pos[i] = (int((x + dx * self.wind_intensity) % self.width),
+                                 int((y + dy * self.wind_intensity) % self.height))
+            if self.rng.random() < 0.1:
+                self.cloud_direction[i] = np.clip(self.cloud_direction[i] + self.rng.uniform(-0.1, 0.1, 2), -1, 1)
+
+            x, y = self.cloud_pos[i]
+            if self.cloud_size[i] > 5:
+                range_ = self.cloud_size[i] + 2
+                footprint = (slice(max(x-range_, 0), x+range_+1), slice(max(y-range_, 0), y+range_+1))
+                raining = self.status[footprint] == BURNING
+                self.status[footprint][raining] = FINE
+                self.CO2_emission[footprint][raining] /= 1.5
+
+            distance = np.abs(self.cloud_pos - self.cloud_pos[i]).max(axis=1)
+            merged = alive & (distance == 1)
+            self.cloud_size[i] += self.cloud_size[merged].sum()
+            alive &= ~merged
+
+        self.cloud_pos = self.cloud_pos[alive]
+        self.cloud_direction = self.cloud_direction[alive]
+        self.cloud_size = self.cloud_size[alive]
+
+    def step_firemen(self):
+        '''
+        Cada bombeiro apaga o fogo da sua célula e vai para uma árvore vizinha em chamas, se houver;
+        senão, dá um passo em direção à célula em chamas atribuída pelo despacho ou, sem fogo, anda
+        para uma célula vizinha aleatória (ver `Fireman.step`).
+        '''
+        targets = dispatch.assign_targets(self.fireman_pos, np.argwhere(self.status == BURNING))
+        for i in self.rng.permutation(len(self.fireman_pos)):
+            x, y = self.fireman_pos[i]
+            if self.status[x, y] == BURNING:
+                self.status[x, y] = FINE
+            neighbors = [(x+dx, y+dy) for dx, dy in MOORE if self._in_grid(x+dx, y+dy)]
+            burning = [pos for pos in neighbors if self.status[pos] == BURNING]
+            if burning:
+                target = burning[0]
+                self.status[target] = FINE
+            elif targets is not None:
+                target = dispatch.step_towards((x, y), targets[i])
+            else:
+                target = neighbors[self.rng.integers(len(neighbors))]
+            self.fireman_pos[i] = target
+
+    def step(self):
+        """
+        Realiza um passo no modelo: fogo, reprodução, nuvens e bombeiros.
+        """
+        profiler = self.profiler
+        if self.wind_intensity != 0:
+            with profiler.phase("propagate_fire"):
+                self.propagate_fire()
+        with profiler.phase("spread_fire"):
+            self.spread_fire()
+        with profiler.phase("reproduce"):
+            self.reproduce()
+        with profiler.phase("schedule.Cloud"):
+            self.step_clouds()
+        with profiler.phase("schedule.Fireman"):
+            self.step_firemen()
+
+        self.schedule.step()
+        with profiler.phase("clusters"):
+            self.clusters.update(self.status == BURNING)
+        with profiler.phase("datacollector"):
+            self._collect_if_due()
+
+        if self.rainy_season and self.schedule.steps % 10 == 0:
+            with profiler.phase("clouds"):
+                self._initialize_clouds(5)
+
+        if self.biome.humidity < 11 and self.schedule.steps % 5 == 0:
+            with profiler.phase("random_fire"):
+                self._random_fire()
+                self.clusters.update(self.status == BURNING)
+
+        profiler.end_step(self.datacollector, self.schedule.steps)
+
+    def collect(self):
+        """Coleta os dados do passo."""
+        self.datacollector.collect(self)
+        self.collected_steps.append(self.schedule.steps)
+
+    def fire_extinguished(self):
+        """Se não há nenhuma célula em chamas."""
+        return not (self.status == BURNING).any()
+
+    def _get_wind_vector(self):
+        """
+        Retorna o vetor de direção do vento com base na configuração.
+        """
+        return {"S": (0, -1), "N": (0, 1), "E": (1, 0), "W": (-1, 0)}.get(self.wind_direction, (0, 0))
+
+    @staticmethod
+    def count_CO2(model):
+        return float((model.CO2_emission.sum() - model.CO2_sequestered.sum()) * model.biome.CO2_emission_factor)
@@ -3,51 +3,26 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import csv
-from mesa.batchrunner import batch_run
-from model import ForestFire
+from sweep import sweep
 
-"""Batch run a mesa model with a set of parameter values.
-
-    Args:
-        model_cls (Type[Model]): The model class to batch-run
-        parameters (Mapping[str, Union[Any, Iterable[Any]]]): Dictionary with model parameters over which to run the model. You can either pass single values or iterables.
-        number_processes (int, optional): Number of processes used, by default 1. Set this to None if you want to use all CPUs.
-        iterations (int, optional): Number of iterations for each parameter combination, by default 1
-        data_collection_period (int, optional): Number of steps after which data gets collected, by default -1 (end of episode)
-        max_steps (int, optional): Maximum number of model steps after which the model halts, by default 1000
-        display_progress (bool, optional): Display batch run process, by default True
-
-    Returns:
-        List[Dict[str, Any]]
-
-    Notes:
-        batch_run assumes the model has a `datacollector` attribute that has a DataCollector object initialized.
-
-    To take advantage of parallel execution of experiments, `batch_run` uses
-    multiprocessing if ``number_processes`` is larger than 1. It is strongly advised
-    to only run in parallel using a normal python file (so don't try to do it in a
-    jupyter notebook). Moreover, best practice when using multiprocessing is to
-    put the code inside an ``if __name__ == '__main__':`` code black as shown below::
-
-    from mesa.batchrunner import batch_run
-
-    params = {"width": 10, "height": 10, "N": range(10, 500, 10)}
-
-    if __name__ == '__main__':
-        results = batch_run(
-            MoneyModel,
-            parameters=params,
-            iterations=5,
-            max_steps=100,
-            number_processes=None,
-            data_collection_period=1,
-            display_progress=True,
-        )
+"""
+Roda o modelo várias vezes com um conjunto de parâmetros (ver sweep.py).
 
-        
+Os resultados são gravados em blocos no diretório OUTPUT à medida que as execuções terminam,
+e execuções já gravadas são puladas se o script for interrompido e rodado de novo.
+Para ler os resultados: `sweep.load(OUTPUT)`.
 """
 
+ENGINE = "agents" # "agents" ou "array" (ver engines.py)
+ITERATIONS = 100
+SEED = 42 # Semente base: cada iteração recebe uma semente filha independente
+OUTPUT = "data"
+DATA_COLLECTION_PERIOD = 1 # Grava os dados a cada tantos passos (0: só o último passo)
+REPORTERS = None # Colunas gravadas, por exemplo ["Burned", "CO2(Kg)"] (None: todas)
+STOP_WHEN_EXTINGUISHED = False # Termina cada execução assim que o fogo acaba
+CACHE_DIR = None # Diretório do cache de resultados, compartilhado entre varreduras (ver cache.py)
+ENSEMBLE = False # Roda as iterações de cada combinação juntas (só com ENGINE = "array", ver ensemble.py)
+
 params = {
     "height": 100,
     "width": 100,
@@ -71,21 +46,19 @@ params = {
 }
 
 if __name__ == "__main__":
-    results = batch_run(
-        ForestFire,
-        parameters=params,
-        iterations=100,
+    sweep(
+        params,
+        OUTPUT,
+        engine=ENGINE,
+        iterations=ITERATIONS,
+        seed=SEED,
         max_steps=100,
-        number_processes=None,
-        data_collection_period=1,
-        display_progress=True,
+        data_collection_period=DATA_COLLECTION_PERIOD,
+        processes=None,
+        reporters=REPORTERS,
+        stop_when_extinguished=STOP_WHEN_EXTINGUISHED,
+        cache_dir=CACHE_DIR,
+        ensemble=ENSEMBLE,
     )
 
-    keys = results[0].keys() if results else []
-
-    with open("data.csv", "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        writer.writerows(results)
-
 # creditos ao Vinicius Maciel 
\ No newline at end of file
@@ -0,0 +1,305 @@
+'''
+Benchmarks da construção do modelo, dos passos e da coleta de dados.
+
+Para cada cenário (motor, tamanho do grid, bioma e vento/nuvens/bombeiros ligados ou não), mede:
+    - o tempo de construção do modelo;
+    - o tempo total dos passos e o tempo e o número de chamadas de cada fase do passo;
+    - células por segundo (células do grid x passos / tempo dos passos);
+    - o pico de memória (tracemalloc) da construção e dos passos, numa segunda execução com a mesma
+      semente, para que o tracemalloc não atrase as medições de tempo.
+
+As fases são medidas envolvendo os métodos do modelo e dos agentes com um cronômetro. Fases podem
+estar contidas em outras: `Cloud.rain`, `Cloud.check_and_merge` e `Fireman.step` rodam dentro de
+`schedule.step` no motor de agentes.
+
+Os resultados são acrescentados, um cenário por linha, num arquivo JSON Lines junto com o commit
+atual, então arquivos gerados em commits diferentes podem ser comparados com `--compare`.
+
+Uso:
+    python -m forest_fire.benchmark resultados.jsonl --sizes 100 200 --biomes Cerrado --steps 20
+    python -m forest_fire.benchmark novo.jsonl --compare antigo.jsonl
+'''
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+
+import mesa
+import numpy as np
+
+from forest_fire.biome import biomes
+
+SIZES = [100, 250, 500, 1000]
+FEATURES = ["wind", "clouds", "firemen"]
+
+# Fases medidas de cada motor: (dono, atributo, nome da fase). O dono "model" é a instância do modelo
+# e "schedule"/"datacollector" são atributos dela; os demais são classes, medidas em todas as instâncias.
+PHASES = {
+    "agents": [
+        ("model", "propagate_fire", "spread"),
+        ("schedule", "step", "schedule.step"),
+        ("model", "collect", "datacollector"),
+        ("model", "_initialize_clouds", "clouds"),
+        ("model", "_random_fire", "random_fire"),
+        ("forest_fire.tree.Tree", "step", "Tree.step"),
+        ("forest_fire.cloud.Cloud", "rain", "Cloud.rain"),
+        ("forest_fire.cloud.Cloud", "check_and_merge", "Cloud.check_and_merge"),
+        ("forest_fire.fireman.Fireman", "step", "Fireman.step"),
+    ],
+    "array": [
+        ("model", "propagate_fire", "spread"),
+        ("model", "spread_fire", "spread_fire"),
+        ("model", "reproduce", "reproduce"),
+        ("model", "step_clouds", "Cloud.step"),
+        ("model", "step_firemen", "Fireman.step"),
+        ("schedule", "step", "schedule.step"),
+        ("datacollector", "collect", "datacollector"),
+        ("model", "_initialize_clouds", "clouds"),
+        ("model", "_random_fire", "random_fire"),
+    ],
+}
+
+
+def scenarios(engines, sizes, biome_names, features):
+    '''
+    Gera os cenários: todas as combinações de motor, tamanho, bioma e conjunto de recursos ligados.
+
+    Params:
+        - features (list[tuple[str]])
+            Conjuntos de recursos ligados, por exemplo [(), ("wind", "clouds", "firemen")]
+    '''
+    for engine, size, biome_name, enabled in itertools.product(engines, sizes, biome_names, features):
+        yield {"engine": engine, "size": size, "biome_name": biome_name, "features": sorted(enabled)}
+
+
+def model_kwargs(scenario: dict, seed: int):
+    '''Parâmetros do modelo para um cenário.'''
+    enabled = scenario["features"]
+    size = scenario["size"]
+    n_units = max(1, size // 20)
+    return {
+        "biome_name": scenario["biome_name"],
+        "width": size,
+        "height": size,
+        "wind_intensity": 0.5 if "wind" in enabled else 0,
+        "rainy_season": "clouds" in enabled,
+        "cloud_quantity": n_units if "clouds" in enabled else 0,
+        "fireman_quantity": n_units if "firemen" in enabled else 0,
+        "seed": seed,
+    }
+
+
+def _resolve(owner: str, model):
+    if owner == "model":
+        return model
+    if owner in ("schedule", "datacollector"):
+        return getattr(model, owner)
+    module, _, name = owner.rpartition(".")
+    return getattr(__import__(module, fromlist=[name]), name)
+
+
+class PhaseTimer:
+    '''
+    Envolve os métodos das fases com um cronômetro, acumulando tempo e número de chamadas por fase.
+    As classes alteradas voltam ao normal em `restore`.
+    '''
+
+    def __init__(self, model, phases):
+        self.time = defaultdict(float)
+        self.calls = defaultdict(int)
+        self._restore = []
+        for owner, attribute, name in phases:
+            target = _resolve(owner, model)
+            if isinstance(target, type):
+                # Nas classes, só métodos definidos nelas mesmas, para restaurá-los depois
+                original = target.__dict__.get(attribute)
+                if original is not None:
+                    self._restore.append((target, attribute, original))
+            else:
+                original = getattr(target, attribute, None)
+            if original is not None:
+                setattr(target, attribute, self._wrap(original, name))
+
+    def _wrap(self, function, name):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.time[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        return timed
+
+    def restore(self):
+        for target, attribute, original in self._restore:
+            setattr(target, attribute, original)
+        self._restore = []
+
+    def report(self):
+        return {name: {"seconds": self.time[name], "calls": self.calls[name]} for name in self.time}
+
+
+def _build(scenario: dict, seed: int):
+    from forest_fire.engines import ENGINES
+    return ENGINES[scenario["engine"]](**model_kwargs(scenario, seed))
+
+
+def run_scenario(scenario: dict, steps: int = 20, seed: int = 42, memory: bool = True):
+    '''
+    Mede um cenário.
+
+    Returns:
+        - result (dict): o cenário, os tempos (em segundos), células por segundo e pico de memória (em MiB)
+    '''
+    cells = scenario["size"] ** 2
+
+    start = time.perf_counter()
+    model = _build(scenario, seed)
+    init_seconds = time.perf_counter() - start
+
+    timer = PhaseTimer(model, PHASES[scenario["engine"]])
+    try:
+        start = time.perf_counter()
+        for _ in range(steps):
+            model.step()
+        step_seconds = time.perf_counter() - start
+    finally:
+        timer.restore()
+
+    result = dict(scenario)
+    result.update({
+        "seed": seed,
+        "steps": steps,
+        "init_seconds": init_seconds,
+        "init_cells_per_second": cells / init_seconds,
+        "step_seconds": step_seconds,
+        "step_cells_per_second": cells * steps / step_seconds if step_seconds else None,
+        "phases": timer.report(),
+    })
+    del model
+
+    if memory:
+        tracemalloc.start()
+        model = _build(scenario, seed)
+        result["init_peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.reset_peak()
+        for _ in range(steps):
+            model.step()
+        result["step_peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        del model
+    return result
+
+
+def environment():
+    '''Versões e commit atuais, gravados com cada resultado.'''
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "mesa": mesa.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def benchmark(output: str, scenario_list, steps: int = 20, seed: int = 42, memory: bool = True, verbose=True):
+    '''
+    Roda os cenários e acrescenta os resultados em `output` (JSON Lines), um por linha.
+
+    Returns:
+        - results (list[dict])
+    '''
+    env = environment()
+    env["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    results = []
+    for scenario in scenario_list:
+        result = {**env, **run_scenario(scenario, steps, seed, memory)}
+        results.append(result)
+        with open(output, "a") as f:
+            f.write(json.dumps(result) + "\n")
+        if verbose:
+            print(format_result(result))
+    return results
+
+
+def scenario_key(result: dict):
+    '''Identifica o cenário de um resultado, para comparar resultados de commits diferentes.'''
+    return (result["engine"], result["size"], result["biome_name"], tuple(result["features"]), result["steps"])
+
+
+def load(path: str):
+    '''Lê um arquivo de resultados; para cenários repetidos, fica o resultado mais recente.'''
+    with open(path) as f:
+        return {scenario_key(result): result for result in map(json.loads, filter(str.strip, f))}
+
+
+def compare(base_path: str, new_path: str):
+    '''
+    Compara dois arquivos de resultados nos cenários em comum.
+
+    Returns:
+        - rows (list[dict]): cenário e razão novo/base dos tempos de construção e dos passos
+          (abaixo de 1: mais rápido)
+    '''
+    base, new = load(base_path), load(new_path)
+    rows = []
+    for key in sorted(base.keys() & new.keys(), key=str):
+        rows.append({
+            "scenario": key,
+            "init_ratio": new[key]["init_seconds"] / base[key]["init_seconds"],
+            "step_ratio": new[key]["step_seconds"] / base[key]["step_seconds"],
+        })
+    return rows
+
+
+def format_result(result: dict):
+    features = "+".join(result["features"]) or "-"
+    text = (f"{result['engine']:>6} {result['size']:>5}² {result['biome_name']:<15} {features:<20}"
+            f" init {result['init_seconds']:8.3f}s  passos {result['step_seconds']:8.3f}s"
+            f"  {result['step_cells_per_second'] or 0:12.0f} células/s")
+    if "step_peak_mib" in result:
+        text += f"  pico {max(result['init_peak_mib'], result['step_peak_mib']):8.1f} MiB"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do ForestFire.")
+    parser.add_argument("output", help="Arquivo JSON Lines onde os resultados são acrescentados")
+    parser.add_argument("--engines", nargs="+", default=["agents"], choices=["agents", "array"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--biomes", nargs="+", default=list(biomes), choices=list(biomes))
+    parser.add_argument("--features", nargs="+", default=None, metavar="wind+clouds+firemen",
+                        help="Conjuntos de recursos ligados ('-' para nenhum); por padrão, todas as combinações")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="Não mede o pico de memória")
+    parser.add_argument("--compare", metavar="BASE", help="Compara `output` com um arquivo de resultados anterior")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        for row in compare(args.compare, args.output):
+            print(f"{str(row['scenario']):<80} init x{row['init_ratio']:.2f}  passos x{row['step_ratio']:.2f}")
+        return
+
+    if args.features is None:
+        features = [combination for n in range(len(FEATURES) + 1) for combination in itertools.combinations(FEATURES, n)]
+    else:
+        features = [tuple(f for f in item.split("+") if f in FEATURES) for item in args.features]
+
+    benchmark(args.output, scenarios(args.engines, args.sizes, args.biomes, features),
+              args.steps, args.seed, not args.no_memory)
+
+
+if __name__ == "__main__":
+    main()
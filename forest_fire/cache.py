@@ -0,0 +1,150 @@
+'''
+Cache em disco dos resultados das execuções sem visualização (ver headless.py).
+
+Cada resultado (as colunas coletadas, indexadas pelo passo) é gravado num arquivo `.npz` cujo nome é
+o hash da execução: motor, parâmetros do construtor (com os valores padrão preenchidos), semente,
+opções do `run` e versão do código (um hash dos arquivos `.py` do pacote). Mudar qualquer um deles
+gera outra chave, então resultados de código antigo nunca são reaproveitados.
+
+O cache tem tamanho máximo: ao passar dele, os resultados usados há mais tempo são apagados (LRU,
+pela data de modificação, que é atualizada a cada leitura). Execuções sem semente não são
+guardadas, pois não se repetem.
+
+Uso:
+    cache = ResultCache("cache")
+    data = cache.run("agents", {"biome_name": "Caatinga", "seed": 1}, 100, collect_every=0)
+'''
+
+import glob
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+
+# Parâmetros do construtor que não mudam o resultado
+IGNORED_PARAMETERS = {"debug", "profile", "tiles"}
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    '''Hash dos arquivos `.py` do pacote, calculado uma vez por processo.'''
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def canonical_parameters(engine: str, kwargs: dict):
+    '''Parâmetros do construtor do motor, com os valores padrão preenchidos.'''
+    from forest_fire.engines import ENGINES
+
+    signature = inspect.signature(ENGINES[engine].__init__)
+    bound = signature.bind_partial(**kwargs)
+    bound.apply_defaults()
+    return {name: value for name, value in bound.arguments.items()
+            if name != "self" and name not in IGNORED_PARAMETERS}
+
+
+def cache_key(engine: str, kwargs: dict, n_steps: int, collect_every: int = 1, reporters=None,
+              stop_when_extinguished: bool = True):
+    '''Chave de uma execução: hash de tudo o que determina o seu resultado.'''
+    description = json.dumps({
+        "engine": engine,
+        "parameters": canonical_parameters(engine, kwargs),
+        "run": [n_steps, collect_every, None if reporters is None else list(reporters), stop_when_extinguished],
+        "code": code_version(),
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+class ResultCache:
+    '''
+    Resultados de execuções guardados em `directory`, com no máximo `max_bytes` bytes.
+    '''
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key: str):
+        '''
+        Returns:
+            - data (pd.DataFrame | None): Resultado guardado, ou None se não houver
+        '''
+        import pandas as pd
+
+        path = self._path(key)
+        try:
+            with np.load(path) as stored:
+                data = pd.DataFrame({name: stored[name] for name in stored.files if name != "Step"},
+                                    index=pd.Index(stored["Step"], name="Step"))
+            os.utime(path)  # Marca como usado agora, para o LRU
+        except (FileNotFoundError, OSError, ValueError):
+            # Ausente, ou apagado/corrompido por outro processo ao mesmo tempo
+            return None
+        return data
+
+    def put(self, key: str, data):
+        '''Guarda o resultado e apaga os mais antigos se o cache passar do tamanho máximo.'''
+        arrays = {name: data[name].to_numpy() for name in data.columns}
+        arrays["Step"] = data.index.to_numpy()
+        # Grava num arquivo temporário e renomeia, para que leitores nunca vejam um arquivo pela metade
+        fd, temporary = tempfile.mkstemp(suffix=".npz", dir=self.directory)
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, self._path(key))
+        self.evict()
+
+    def evict(self):
+        '''Apaga os resultados usados há mais tempo até o cache caber em `max_bytes`.'''
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.npz")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def run(self, engine: str, kwargs: dict, n_steps: int, collect_every: int = 1, reporters=None,
+            stop_when_extinguished: bool = True):
+        '''
+        Devolve o resultado de `model.run(...)` do cache ou, se não houver, roda e guarda.
+        Os argumentos são os do construtor do motor e os de `HeadlessRun.run`.
+
+        Returns:
+            - data (pd.DataFrame): Dados coletados, indexados pelo passo
+        '''
+        from forest_fire.engines import ENGINES
+
+        cacheable = kwargs.get("seed") is not None
+        if cacheable:
+            key = cache_key(engine, kwargs, n_steps, collect_every, reporters, stop_when_extinguished)
+            data = self.get(key)
+            if data is not None:
+                return data
+
+        model = ENGINES[engine](**kwargs)
+        data = model.run(n_steps, collect_every=collect_every, reporters=reporters,
+                         stop_when_extinguished=stop_when_extinguished)
+        if cacheable:
+            self.put(key, data)
+        return data
@@ -0,0 +1,37 @@
+'''
+Checkpoints do estado completo de um modelo (`ForestFire` ou `ForestFireArray`).
+
+O modelo é serializado com pickle e comprimido com gzip. Isso inclui o grid, os agentes, o
+agendador, a contagem de passos, o estado dos geradores aleatórios e o histórico do
+`datacollector`. Um modelo restaurado continua a simulação exatamente como o original continuaria.
+Cada modelo define `__getstate__`/`__setstate__` para as partes que o pickle não serializa
+(os reporters do `datacollector` são lambdas e o agendador do mesa guarda referências fracas).
+
+Só carregue checkpoints de fontes confiáveis: pickle pode executar código ao carregar.
+'''
+
+import gzip
+import pickle
+
+
+def save(model, path: str):
+    '''Grava o estado do modelo em `path`.'''
+    with gzip.open(path, "wb", compresslevel=6) as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load(path: str):
+    '''Carrega um modelo gravado com `save`.'''
+    with gzip.open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def collected_data(datacollector):
+    '''Histórico de um `DataCollector`, sem os reporters.'''
+    return {"model_vars": datacollector.model_vars, "tables": datacollector.tables}
+
+
+def restore_collected_data(datacollector, data):
+    '''Restaura num `DataCollector` recém-criado o histórico salvo por `collected_data`.'''
+    datacollector.model_vars = data["model_vars"]
+    datacollector.tables = data["tables"]
@@ -1,11 +1,14 @@
-import mesa
-from forest_fire.tree import Tree
+from forest_fire.agent import CellAgent
+from forest_fire.layers import AIR
 
-class SmoothWalker(mesa.Agent):
+class SmoothWalker(CellAgent):
     """
     Agente que se move suavemente em uma direção e pode mudar sua direção
     gradualmente após alguns passos.
     """
+    __slots__ = ("size", "direction", "change_rate")
+    status = "Cloud"
+    active = True # Nuvens se movem a todo passo
 
     def __init__(self, unique_id, pos, model, size=1.0, direction=(0, 0), change_rate=0.1):
         super().__init__(unique_id, model)
@@ -13,14 +16,13 @@ class SmoothWalker(mesa.Agent):
         self.size = size
         self.direction = direction  
         self.change_rate = change_rate
-        self.status = "Cloud"
 
     def random_move(self):
         """Move o agente suavemente na direção atual."""
         x, y = self.pos
         dx, dy = self.direction
         new_pos = ((x + dx) % self.model.width, (y + dy) % self.model.height)
-        self.model.grid.move_agent(self, new_pos)
+        self.model.move_agent(self, new_pos)
         self.pos = new_pos
 
         if self.random.random() < self.change_rate:
@@ -33,6 +35,9 @@ class SmoothWalker(mesa.Agent):
         self.direction = (max(-1, min(new_dx, 1)), max(-1, min(new_dy, 1)))
 
 class Cloud(SmoothWalker):
+    __slots__ = ("color", "full", "speed", "direction_change_rate")
+    layer = AIR
+
     def __init__(self, unique_id, pos, model, size, color, direction, full=False, speed=.2, direction_change_rate=0.1):
         super().__init__(unique_id, pos, model, size=size, direction=direction, change_rate=direction_change_rate)
         self.color = color
@@ -46,8 +51,7 @@ class Cloud(SmoothWalker):
         if self.pos is not None:
             # Verifica se a nuvem está na borda do grid e a remove se necessário
             if self.pos[0] == 0 or self.pos[0] == self.model.width - 1 or self.pos[1] == 0 or self.pos[1] == self.model.height - 1:
-                self.model.grid.remove_agent(self)
-                self.model.schedule.remove(self)
+                self.model.remove_agent(self)
                 return 
             self.controlled_move()            
             if self.full:
@@ -63,7 +67,7 @@ class Cloud(SmoothWalker):
         new_x = int((x + dx * self.speed) % self.model.width) 
         new_y = int((y + dy * self.speed) % self.model.height) 
         new_pos = (new_x, new_y)
-        self.model.grid.move_agent(self, new_pos)
+        self.model.move_agent(self, new_pos)
         self.pos = new_pos
         if self.random.random() < self.direction_change_rate:
             self.change_direction()
@@ -75,27 +79,17 @@ class Cloud(SmoothWalker):
         self.direction = (max(-1, min(new_dx, 1)), max(-1, min(new_dy, 1)))
 
     def rain(self):
-        """Simula a chuva."""
-        x, y = self.pos
-        range_ = self.size + 2
-        for dx in range(-range_, range_ + 1):
-            for dy in range(-range_, range_ + 1):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.model.width and 0 <= ny < self.model.height:
-                    # Verifica se é uma árvore e se está queimando
-                    tree = self.model.grid.get_cell_list_contents([(nx, ny)])
-                    for t in tree:
-                        if isinstance(t, Tree) and t.status == "Burning":
-                            t.status = "Fine"  # Apaga o fogo
-                            t.CO2_emission /= 1.5  # Reduz a emissão de CO2 em 33% ao ser apagada
+        """Simula a chuva: apaga as árvores em chamas a até `size + 2` células da nuvem."""
+        for tree in self.model.burning_trees_around(self.pos, self.size + 2):
+            tree.status = "Fine"  # Apaga o fogo
+            tree.CO2_emission /= 1.5  # Reduz a emissão de CO2 em 33% ao ser apagada
+
     def check_and_merge(self):
         """Verifica se há nuvens próximas e as funde em uma única nuvem maior."""
         if self.pos is not None:
-            for neighbor in self.model.grid.get_neighbors(self.pos, moore=True):
-                if isinstance(neighbor, Cloud):
-                    self.size += neighbor.size
-                    self.full = self.size > 5
-                    self.model.grid.remove_agent(neighbor)  
-                    self.model.schedule.remove(neighbor)
+            for neighbor in self.model.clouds_around(self.pos):
+                self.size += neighbor.size
+                self.full = self.size > 5
+                self.model.remove_agent(neighbor)
                     
 
@@ -0,0 +1,172 @@
+'''
+Áreas queimadas contínuas (clusters) e frentes de fogo, mantidas passo a passo.
+
+Cada célula que pega fogo entra numa estrutura union-find e é unida às células vizinhas (vizinhança
+de Moore) que já queimaram, então o custo é proporcional às células que pegam fogo, e não ao tamanho
+do grid. Uma célula que queimou continua no seu cluster mesmo que a árvore seja retirada ou
+replantada: os clusters são as cicatrizes do fogo, que só crescem e se juntam.
+
+Métricas, usadas como colunas do `datacollector`:
+    - frentes de fogo: componentes conexas (vizinhança de Moore) das células em chamas no passo;
+    - maior área queimada: número de células do maior cluster das cicatrizes;
+    - cluster percolante: se as células queimadas no incêndio atual, isto é, desde a última vez em
+      que não havia fogo no fim de um passo, formam um cluster que liga bordas opostas do grid.
+'''
+
+from array import array
+
+import numpy as np
+
+# Bordas tocadas por um cluster, como bits
+LEFT, RIGHT, BOTTOM, TOP = 1, 2, 4, 8
+
+
+def _find(parent: dict, cell: int):
+    while parent[cell] != cell:
+        parent[cell] = parent[parent[cell]]  # Compressão de caminho pela metade
+        cell = parent[cell]
+    return cell
+
+
+class BurnClusters:
+    '''
+    Union-find das células que já queimaram num grid (width, height), com índice x * height + y,
+    e as células em chamas e as queimadas no incêndio atual, para as frentes e a percolação.
+    '''
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        n = width * height
+        self.parent = array('i', [-1]) * n  # -1: célula que nunca queimou
+        self.size = array('i', [0]) * n  # Células do cluster, na raiz
+        self.clusters = 0
+        self.largest = 0
+        self.burning_cells = {}  # Célula em chamas -> árvores em chamas nela
+        # Union-find esparso das células queimadas no incêndio atual, com as bordas tocadas na raiz
+        self.fire_parent = {}
+        self.fire_edges = {}
+        self.spanning = False
+        self._previous = None  # Máscara das células em chamas na última chamada de `update`
+
+    def find(self, cell: int):
+        parent = self.parent
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]  # Compressão de caminho pela metade
+            cell = parent[cell]
+        return cell
+
+    def _neighbours(self, cell: int):
+        height = self.height
+        x, y = divmod(cell, height)
+        for nx in range(max(x - 1, 0), min(x + 2, self.width)):
+            for ny in range(max(y - 1, 0), min(y + 2, height)):
+                neighbour = nx * height + ny
+                if neighbour != cell:
+                    yield neighbour
+
+    def _edges(self, cell: int):
+        x, y = divmod(cell, self.height)
+        return (LEFT if x == 0 else 0) | (RIGHT if x == self.width - 1 else 0) \
+            | (BOTTOM if y == 0 else 0) | (TOP if y == self.height - 1 else 0)
+
+    def _union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.clusters -= 1
+        return a
+
+    def _add(self, cell: int):
+        '''Coloca nas cicatrizes uma célula que acabou de pegar fogo, unindo-a às vizinhas queimadas.'''
+        self.parent[cell] = cell
+        self.size[cell] = 1
+        self.clusters += 1
+        root = cell
+        for neighbour in self._neighbours(cell):
+            if self.parent[neighbour] != -1:
+                root = self._union(root, neighbour)
+        if self.size[root] > self.largest:
+            self.largest = self.size[root]
+
+    def _add_to_fire(self, cell: int):
+        '''Coloca uma célula no incêndio atual, unindo-a às vizinhas queimadas nele.'''
+        parent, edges = self.fire_parent, self.fire_edges
+        parent[cell] = cell
+        edges[cell] = self._edges(cell)
+        root = cell
+        for neighbour in self._neighbours(cell):
+            if neighbour in parent:
+                other = _find(parent, neighbour)
+                if other != root:
+                    parent[other] = root
+                    edges[root] |= edges.pop(other)
+        touched = edges[root]
+        if (touched & (LEFT | RIGHT)) == (LEFT | RIGHT) or (touched & (BOTTOM | TOP)) == (BOTTOM | TOP):
+            self.spanning = True
+
+    def ignite(self, cell: int):
+        '''Uma árvore da célula `cell` começou a queimar.'''
+        if self.parent[cell] == -1:
+            self._add(cell)
+        if cell not in self.fire_parent:
+            self._add_to_fire(cell)
+        self.burning_cells[cell] = self.burning_cells.get(cell, 0) + 1
+
+    def extinguish(self, cell: int):
+        '''Uma árvore da célula `cell` deixou de queimar (queimou por completo ou foi retirada).'''
+        count = self.burning_cells[cell] - 1
+        if count:
+            self.burning_cells[cell] = count
+        else:
+            del self.burning_cells[cell]
+
+    def end_step(self):
+        '''Fim de um passo do modelo: sem fogo, o incêndio atual acabou e o próximo começa do zero.'''
+        if not self.burning_cells:
+            self.fire_parent = {}
+            self.fire_edges = {}
+            self.spanning = False
+
+    @property
+    def fronts(self):
+        '''Frentes de fogo: componentes conexas das células em chamas.'''
+        parent = {cell: cell for cell in self.burning_cells}
+        fronts = len(parent)
+        for cell in parent:
+            for neighbour in self._neighbours(cell):
+                if neighbour in parent:
+                    a, b = _find(parent, cell), _find(parent, neighbour)
+                    if a != b:
+                        parent[b] = a
+                        fronts -= 1
+        return fronts
+
+    def update(self, burning):
+        '''
+        Atualiza a estrutura a partir da máscara (width, height) das células em chamas no fim de um
+        passo, comparando-a com a da chamada anterior; para modelos que guardam o estado das
+        células em arrays.
+        '''
+        burning = np.asarray(burning, dtype=bool).ravel()
+        previous = self._previous if self._previous is not None else np.zeros_like(burning)
+        for cell in np.flatnonzero(burning & ~previous).tolist():
+            self.ignite(cell)
+        for cell in np.flatnonzero(previous & ~burning).tolist():
+            self.extinguish(cell)
+        self._previous = burning
+        self.end_step()
+
+    def burned_mask(self):
+        '''Células que já queimaram, no formato (width, height).'''
+        return (np.frombuffer(self.parent, dtype=np.int32) != -1).reshape(self.width, self.height)
+
+    def fire_mask(self):
+        '''Células queimadas no incêndio atual, no formato (width, height).'''
+        mask = np.zeros(self.width * self.height, dtype=bool)
+        mask[list(self.fire_parent)] = True
+        return mask.reshape(self.width, self.height)
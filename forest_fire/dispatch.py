@@ -0,0 +1,72 @@
+'''
+Despacho dos bombeiros: a cada passo, distribui os bombeiros entre as células em chamas.
+
+As células em chamas (a fronteira do fogo) são lidas de uma vez do modelo, e cada bombeiro recebe
+um alvo: a célula em chamas mais próxima (distância de Chebyshev, que é o número de passos de um
+bombeiro) que ainda não tenha bombeiros demais. Assim os bombeiros se espalham pela frente de fogo
+em vez de irem todos para a mesma célula. Depois, cada bombeiro só dá um passo na direção do alvo.
+'''
+
+import math
+import numpy as np
+
+# Células em chamas candidatas por bombeiro, das mais próximas para as mais distantes
+CANDIDATES = 16
+# Bombeiros por bloco no cálculo das distâncias, para limitar a memória (bloco x células em chamas)
+CHUNK_SIZE = 256
+
+
+def assign_targets(firemen, fires, candidates: int = CANDIDATES):
+    '''
+    Atribui a cada bombeiro uma célula em chamas.
+
+    Os bombeiros mais perto do fogo escolhem primeiro. Cada célula recebe no máximo
+    `ceil(bombeiros / células em chamas)` bombeiros; quem não encontra vaga entre as suas
+    `candidates` células mais próximas fica com a menos disputada delas.
+
+    Params:
+        - firemen (np.ndarray)
+            Posições (x, y) dos bombeiros, formato (F, 2)
+        - fires (np.ndarray)
+            Posições (x, y) das células em chamas, formato (B, 2)
+
+    Returns:
+        - targets (np.ndarray): Alvo de cada bombeiro, formato (F, 2), ou None se não há fogo
+    '''
+    firemen = np.asarray(firemen).reshape(-1, 2)
+    fires = np.asarray(fires).reshape(-1, 2)
+    if len(fires) == 0 or len(firemen) == 0:
+        return None
+
+    k = min(candidates, len(fires))
+    nearest = np.empty((len(firemen), k), dtype=np.intp)
+    nearest_distance = np.empty((len(firemen), k), dtype=np.int64)
+    for start in range(0, len(firemen), CHUNK_SIZE):
+        chunk = firemen[start:start + CHUNK_SIZE]
+        distance = np.abs(chunk[:, None, :] - fires[None, :, :]).max(axis=2)
+        if k < len(fires):
+            index = np.argpartition(distance, k - 1, axis=1)[:, :k]
+        else:
+            index = np.broadcast_to(np.arange(k), distance.shape).copy()
+        index_distance = np.take_along_axis(distance, index, axis=1)
+        order = np.argsort(index_distance, axis=1, kind="stable")
+        nearest[start:start + CHUNK_SIZE] = np.take_along_axis(index, order, axis=1)
+        nearest_distance[start:start + CHUNK_SIZE] = np.take_along_axis(index_distance, order, axis=1)
+
+    capacity = math.ceil(len(firemen) / len(fires))
+    claims = np.zeros(len(fires), dtype=np.int64)
+    targets = np.empty_like(firemen)
+    for i in np.argsort(nearest_distance[:, 0], kind="stable"):
+        candidates_claims = claims[nearest[i]]
+        free = np.flatnonzero(candidates_claims < capacity)
+        choice = nearest[i, free[0]] if len(free) else nearest[i, np.argmin(candidates_claims)]
+        claims[choice] += 1
+        targets[i] = fires[choice]
+    return targets
+
+
+def step_towards(pos, target):
+    '''Próxima posição de quem anda uma célula (vizinhança de Moore) de `pos` em direção a `target`.'''
+    x, y = pos
+    tx, ty = target
+    return (x + (tx > x) - (tx < x), y + (ty > y) - (ty < y))
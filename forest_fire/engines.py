@@ -0,0 +1,8 @@
+from forest_fire.model import ForestFire
+from forest_fire.array_model import ForestFireArray
+
+# Motores de simulação disponíveis, com os mesmos parâmetros e colunas coletadas
+ENGINES = {
+    "agents": ForestFire,      # Um agente do mesa por célula
+    "array": ForestFireArray,  # Estado das células em arrays do NumPy
+}
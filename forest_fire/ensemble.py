@@ -0,0 +1,266 @@
+'''
+Conjunto (ensemble) de réplicas do `ForestFireArray` avançadas juntas, passo a passo.
+
+As réplicas têm os mesmos parâmetros e sementes diferentes. O estado das células fica em tensores
+(n_replicas, width, height), indexados por [réplica, x, y] como os arrays do `ForestFireArray`, e
+cada réplica usa uma fatia (uma view) desses tensores. A propagação do fogo e a reprodução das
+árvores são feitas para todas as réplicas de uma vez (ver spread.py, que aceita eixos extras na
+frente); nuvens, bombeiros, focos aleatórios e clusters, que são poucos ou sequenciais, continuam
+sendo passos de cada réplica, nas suas fatias.
+
+Cada réplica tem o seu próprio gerador e faz os mesmos sorteios, na mesma ordem, que um
+`ForestFireArray` com a sua semente: a réplica i dá os mesmos dados que
+
+    ForestFireArray(biome_name, seed=ensemble.seeds[i], ...).run(...)
+
+Uso:
+    ensemble = ForestFireEnsemble("Caatinga", n_replicas=100, seed=42, width=50, height=50)
+    data = ensemble.run(100, reporters=["Burned", "CO2(Kg)"])  # Indexado por (Replica, Step)
+'''
+
+import numpy as np
+import pandas as pd
+
+from forest_fire import spread
+from forest_fire.array_model import ForestFireArray
+from forest_fire.landscape import GROUND, EMPTY, FINE, BURNING, BURNED
+from forest_fire.seeds import child_seeds, _to_seed
+
+# Arrays de estado (width, height) do `ForestFireArray` guardados como tensores das réplicas
+STATE_ARRAYS = ("terrain", "status", "size", "CO2_emission", "CO2_sequestered")
+# Colunas que dependem dos clusters de áreas queimadas (ver clusters.py), o passo mais caro por réplica
+CLUSTER_COLUMNS = ("Fire fronts", "Largest burned patch", "Spanning")
+# Células por bloco de réplicas nos passos vetorizados, para que os arrays temporários caibam no cache
+BLOCK_CELLS = 2**16
+
+
+class ReplicaDraws:
+    '''
+    Sorteios uniformes de um tensor (n_replicas, ...), cada fatia com o gerador da sua réplica.
+    Só as réplicas de `active` sorteiam (as demais recebem zeros), como um modelo que pula o sorteio.
+    '''
+
+    def __init__(self, generators, active):
+        self.generators = generators
+        self.active = active
+
+    def random(self, shape):
+        values = np.zeros(shape)
+        for i in np.flatnonzero(self.active):
+            values[i] = self.generators[i].random(shape[1:])
+        return values
+
+
+class ForestFireEnsemble:
+    '''
+    Réplicas do `ForestFireArray` com os mesmos parâmetros, avançadas juntas.
+
+    Params:
+        - biome_name (str)
+        - n_replicas (int)
+            Número de réplicas, com sementes filhas de `seed` (ignorado se `seeds` for informado)
+        - seeds (list[int] | None)
+            Semente de cada réplica
+        - seed (int | None)
+            Semente base (None: sorteada)
+        - parameters
+            Demais parâmetros do `ForestFireArray`, iguais para todas as réplicas
+    '''
+
+    def __init__(self, biome_name, n_replicas: int = 1, seeds=None, seed=None, **parameters):
+        if parameters.get("tiles", 1) > 1:
+            raise ValueError("As réplicas do ensemble não podem ser divididas em faixas (tiles)")
+        if seeds is None:
+            seeds = child_seeds(_to_seed(np.random.SeedSequence()) if seed is None else seed, n_replicas)
+        self.seeds = list(seeds)
+        self.replicas = [ForestFireArray(biome_name, seed=replica_seed, **parameters) for replica_seed in self.seeds]
+
+        first = self.replicas[0]
+        self.biome = first.biome
+        self.width, self.height = first.width, first.height
+        self.steps = 0
+
+        # Cada réplica passa a usar a sua fatia dos tensores
+        for name in STATE_ARRAYS:
+            tensor = np.stack([getattr(replica, name) for replica in self.replicas])
+            setattr(self, name, tensor)
+            for i, replica in enumerate(self.replicas):
+                setattr(replica, name, tensor[i])
+        self.generators = [replica.rng for replica in self.replicas]
+        per_block = max(BLOCK_CELLS // (self.width * self.height), 1)
+        self.blocks = [slice(start, start + per_block) for start in range(0, len(self.replicas), per_block)]
+
+        self.reporters = None
+        self.collect_every = 1
+        self.rows = []  # (réplica, passo, valores) de cada linha coletada
+        self._reporters = self._make_reporters()
+        self._track_clusters = True
+        self.running = np.ones(len(self.replicas), dtype=bool)  # Réplicas que ainda estão sendo coletadas
+
+    def __len__(self):
+        return len(self.replicas)
+
+    def _make_reporters(self):
+        '''
+        Colunas do `datacollector` do `ForestFireArray`, cada uma com um valor por réplica.
+        As contagens de células são feitas nos tensores; as demais, em cada réplica.
+        '''
+        reporters = {
+            "Fine": lambda ensemble: np.count_nonzero(ensemble.status == FINE, axis=(1, 2)),
+            "Burning": lambda ensemble: np.count_nonzero(ensemble.status == BURNING, axis=(1, 2)),
+            "Burned": lambda ensemble: np.count_nonzero(ensemble.status == BURNED, axis=(1, 2)),
+            "Terra": lambda ensemble: np.count_nonzero((ensemble.status == EMPTY) & (ensemble.terrain == GROUND),
+                                                       axis=(1, 2)),
+            "Total": lambda ensemble: np.count_nonzero(ensemble.status, axis=(1, 2)),
+        }
+        replica_reporters = self.replicas[0].datacollector.model_reporters
+        for name, reporter in replica_reporters.items():
+            if name not in reporters:
+                reporters[name] = lambda ensemble, reporter=reporter: [reporter(replica) for replica in ensemble.replicas]
+        reporters = {name: reporters[name] for name in replica_reporters}
+
+        if self.reporters is None:
+            return reporters
+        unknown = [name for name in self.reporters if name not in reporters]
+        if unknown:
+            raise ValueError(f"Reporters desconhecidos: {unknown}. Disponíveis: {list(reporters)}")
+        return {name: reporters[name] for name in self.reporters}
+
+    def collect(self, replicas=None):
+        '''Coleta os dados do passo das réplicas `replicas` (máscara; None: as que estão rodando).'''
+        replicas = self.running if replicas is None else replicas
+        columns = [np.asarray(reporter(self)).tolist() for reporter in self._reporters.values()]
+        for i in np.flatnonzero(replicas).tolist():
+            self.rows.append((i, self.steps, [column[i] for column in columns]))
+
+    def fire_extinguished(self):
+        '''Se não há nenhuma célula em chamas, por réplica.'''
+        return ~(self.status == BURNING).any(axis=(1, 2))
+
+    def propagate_fire(self, block: slice):
+        '''
+        Propagação do fogo influenciada pelo vento (ver `ForestFireArray.propagate_fire`) nas réplicas
+        do bloco, com um sorteio por réplica que tem fogo.
+        '''
+        first = self.replicas[0]
+        status = self.status[block]
+        draws = ReplicaDraws(self.generators[block], (status == BURNING).any(axis=(1, 2)))
+        spread.wind_spread(status, self.size[block], self.CO2_emission[block],
+                           first._get_wind_vector(), first.wind_intensity, draws)
+
+    def spread_fire(self, block: slice):
+        '''Propagação de `Tree.step` nas réplicas do bloco de uma vez (ver `ForestFireArray.spread_fire`).'''
+        spread.spread(self.status[block], self.terrain[block], self.size[block], self.CO2_emission[block],
+                      self.replicas[0].corridor_radius)
+
+    def reproduce(self, block: slice):
+        '''
+        Reprodução das árvores nas réplicas do bloco de uma vez (ver `ForestFireArray.reproduce`).
+        Os tamanhos das árvores novas são sorteados por réplica, na ordem das células.
+        '''
+        first = self.replicas[0]
+        tree_density, reprod_speed = first.tree_density, first.reprod_speed
+        status, terrain, size, CO2_emission = (self.status[block], self.terrain[block], self.size[block],
+                                               self.CO2_emission[block])
+        generators = self.generators[block]
+        t1, t2, sources = spread.reproduction_sources(status, first.n_first_level, first.n_second_level, tree_density)
+        active = sources.any(axis=(1, 2))
+        if not active.any():
+            return
+        grow, cleared = spread.regrowth(status, terrain, first.n_first_level, first.n_second_level, t1, t2, sources,
+                                        tree_density, reprod_speed, ReplicaDraws(generators, active).random(sources.shape))
+
+        status[cleared] = EMPTY
+        size[cleared] = 0
+        CO2_emission[cleared | grow] = 0
+        status[grow] = FINE
+        # A máscara é percorrida réplica por réplica, então os tamanhos são concatenados nessa ordem
+        counts = np.count_nonzero(grow, axis=(1, 2))
+        size[grow] = np.concatenate([self.biome.size.sample(generators[i], counts[i]) for i in np.flatnonzero(active)])
+
+    def step(self):
+        '''
+        Realiza um passo em todas as réplicas, na ordem de `ForestFireArray.step`.
+        '''
+        first = self.replicas[0]
+        for block in self.blocks:
+            if first.wind_intensity != 0:
+                self.propagate_fire(block)
+            self.spread_fire(block)
+            self.reproduce(block)
+        for replica in self.replicas:
+            replica.step_clouds()
+            replica.step_firemen()
+
+        self.steps += 1
+        for replica in self.replicas:
+            replica.schedule.step()
+        self._update_clusters()
+        if self.collect_every > 0 and self.steps % self.collect_every == 0:
+            self.collect()
+
+        if first.rainy_season and self.steps % 10 == 0:
+            for replica in self.replicas:
+                replica._initialize_clouds(5)
+
+        if self.biome.humidity < 11 and self.steps % 5 == 0:
+            for replica in self.replicas:
+                replica._random_fire()
+            self._update_clusters()
+
+    def _update_clusters(self):
+        # Sem colunas de clusters coletadas, os clusters das réplicas não são mantidos
+        if self._track_clusters:
+            for replica in self.replicas:
+                replica.clusters.update(replica.status == BURNING)
+
+    def run(self, n_steps: int, collect_every: int = 1, reporters=None, stop_when_extinguished: bool = True):
+        '''
+        Roda até `n_steps` passos em todas as réplicas, como `HeadlessRun.run`.
+
+        Com `stop_when_extinguished`, cada réplica deixa de ser coletada assim que o seu fogo acaba
+        (a sua última linha é desse passo), e o conjunto para quando todas acabaram.
+
+        Params:
+            - n_steps (int)
+                Número máximo de passos
+            - collect_every (int)
+                Coleta os dados a cada tantos passos (0: só no último de cada réplica, sem o estado inicial)
+            - reporters (list[str] | None)
+                Colunas coletadas (None: todas)
+            - stop_when_extinguished (bool)
+                Para cada réplica assim que nenhuma célula dela estiver em chamas
+
+        Returns:
+            - data (pd.DataFrame): Dados coletados, indexados por (Replica, Step)
+        '''
+        self.reporters = None if reporters is None else list(reporters)
+        self._reporters = self._make_reporters()
+        self._track_clusters = any(name in self._reporters for name in CLUSTER_COLUMNS)
+        self.collect_every = collect_every
+        self.running = np.ones(len(self.replicas), dtype=bool)
+        last_collected = np.full(len(self.replicas), -1)
+
+        # Dados do estado inicial, que os modelos coletam ao serem criados (sem eles com `collect_every=0`)
+        if self.steps == 0 and collect_every > 0:
+            self.collect()
+            last_collected[:] = 0
+
+        for _ in range(n_steps):
+            if not self.running.any():
+                break
+            self.step()
+            if collect_every > 0 and self.steps % collect_every == 0:
+                last_collected[self.running] = self.steps
+            if stop_when_extinguished:
+                finished = self.running & self.fire_extinguished()
+                # O último passo de cada réplica é sempre coletado
+                self.collect(finished & (last_collected != self.steps))
+                last_collected[finished] = self.steps
+                self.running &= ~finished
+
+        self.collect(self.running & (last_collected != self.steps))
+
+        index = pd.MultiIndex.from_tuples([(replica, step) for replica, step, _ in self.rows], names=["Replica", "Step"])
+        data = pd.DataFrame([values for _, _, values in self.rows], index=index, columns=list(self._reporters))
+        return data.sort_index()
@@ -1,13 +1,18 @@
-import mesa
-from forest_fire.tree import Tree, Terra
+from forest_fire.agent import CellAgent
+from forest_fire.dispatch import step_towards
+from forest_fire.layers import UNITS
 
-class Fireman(mesa.Agent):
+class Fireman(CellAgent):
+    __slots__ = ("target",)
+    layer = UNITS
+    burnable = False
+    status = "Fireman"
+    active = True # Bombeiros se movem a todo passo
 
     def __init__(self, unique_id, model, pos):
         super().__init__(unique_id, model)
         self.pos = pos
-        self.burnable = False
-        self.status = "Fireman"
+        self.target = None # Célula em chamas atribuída pelo despacho do modelo (ver dispatch.py)
 
     def  put_out_fire(self, tree):
         """Apaga o fogo em uma árvore se estiver queimando."""
@@ -18,32 +23,31 @@ class Fireman(mesa.Agent):
 
         """
         Apaga fogo na célula onde está o bombeiro e, caso haja uma árvore no entorno pegando fogo, 
-        se desloca para ela e apaga. Caso contrário, vai para uma árvore ou terra do entorno aleatória.
+        se desloca para ela e apaga. Caso contrário, dá um passo em direção à célula em chamas que
+        recebeu do despacho ou, se não há fogo, vai para uma árvore ou terra do entorno aleatória.
         """
 
         # Apaga o fogo na árvore da célula onde o bombeiro está
-        current_cell = self.model.grid.get_cell_list_contents([self.pos])
-        for agent in current_cell:
-            if isinstance(agent, Tree) and agent.status == "Burning":
-                self.put_out_fire(agent)  
+        for tree in self.model.burning_trees_around(self.pos, 0):
+            self.put_out_fire(tree)
 
         # Movimenta-se para uma árvore vizinha em chamas e apaga o fogo
-        neighbors = self.model.grid.get_neighbors(self.pos, moore=True, include_center=False)
-        burning_trees = [agent for agent in neighbors if isinstance(agent, Tree) and agent.status == "Burning"]
+        burning_trees = self.model.burning_trees_around(self.pos, 1)
 
         if len(burning_trees) != 0:
             target_tree = burning_trees[0]
-            self.model.grid.move_agent(self, target_tree.pos)
-            self.pos = target_tree.pos
+            self.model.move_agent(self, target_tree.pos)
             self.put_out_fire(target_tree)
+        elif self.target is not None:
+            # Vai em direção ao fogo atribuído
+            new_pos = step_towards(self.pos, self.target)
+            if new_pos != self.pos and self.model.is_walkable(new_pos):
+                self.model.move_agent(self, new_pos)
         else:
             # Caso não haja árvores em chamas, mover para uma célula com Terra ou Árvore
-            neighbors2 = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False)
-            valid_neighbors = [
-                pos for pos in neighbors2
-                if any(isinstance(agent, (Terra, Tree)) for agent in self.model.grid.get_cell_list_contents([pos]))
-            ]
+            neighbors = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=False)
+            valid_neighbors = [pos for pos in neighbors if self.model.is_walkable(pos)]
 
             if valid_neighbors:
                 new_pos = self.random.choice(valid_neighbors)
-                self.model.grid.move_agent(self, new_pos)
\ No newline at end of file
+                self.model.move_agent(self, new_pos)
@@ -0,0 +1,185 @@
+'''
+Desenho do grid no navegador como um raster, enviado inteiro ou só com as células que mudaram.
+
+Em vez de um retrato (dicionário) por agente e por célula a cada passo, cada célula vira um código
+de uma paleta: terra, obstáculos e árvores por status e classe de tamanho. A paleta (cor e imagem de
+cada código) é calculada uma vez por bioma e enviada só com o quadro completo. A cada passo o
+servidor manda só as células cujo código mudou; o quadro completo é mandado quando o modelo é
+reiniciado ou quando ele fica menor: a lista de mudanças custa uns 8 bytes por célula no JSON
+(índice e código), e o quadro completo 4/3 de byte por célula em base64, mais a paleta. Nuvens e bombeiros, que são poucos,
+vão numa lista à parte, desenhados por cima.
+
+No navegador, `RasterModule.js` pinta uma célula por pixel e amplia a imagem para o tamanho da tela
+(com as imagens do bioma quando as células são grandes o bastante para elas).
+'''
+
+import base64
+import json
+import os
+
+import numpy as np
+from mesa.visualization.ModularVisualization import VisualizationElement
+
+from forest_fire.biome import biomes
+from forest_fire.landscape import EMPTY, FINE, BURNING, BURNED, STATUS_NAMES
+from forest_fire.layers import AIR
+from forest_fire.tree import SIZE_CLASSES, TREE_IMAGES, size_class
+
+# Códigos fixos da paleta; as árvores vêm depois, um código por status e classe de tamanho
+GROUND_CODE = 0
+OBSTACLE_CODES = {"Lake": 1, "Corridor": 2, "Obstacle": 3, "Burning": 4, "Burned": 5}
+# Código de cada terreno do `ForestFireArray` (GROUND, LAKE, CORRIDOR, OBSTACLE)
+TERRAIN_CODES = np.array([GROUND_CODE, OBSTACLE_CODES["Lake"], OBSTACLE_CODES["Corridor"], OBSTACLE_CODES["Obstacle"]],
+                         dtype=np.uint8)
+N_SIZE_CLASSES = len(SIZE_CLASSES) + 1
+
+
+class Palette:
+    '''
+    Cor e imagem de cada código de célula num bioma.
+
+    Params:
+        - biome (Biome)
+        - colors (dict)
+            Cores de cada status, como `COLORS` de server.py
+    '''
+
+    def __init__(self, biome, colors: dict):
+        images = biome.img_path
+        self.entries = [{"Color": biome.ground_color or colors["Terra"],
+                         "Image": f"{images}/terra.png" if images else None}]
+        for status in OBSTACLE_CODES:
+            has_image = biome.code != 'default' and status in ("Lake", "Corridor", "Obstacle")
+            self.entries.append({"Color": colors[status],
+                                 "Image": f"forest_fire/static/images/obstacles/{status}.png" if has_image else None})
+
+        # Código de cada árvore, por código de status (EMPTY é a terra) e classe de tamanho
+        self.tree_codes = np.full((max(STATUS_NAMES) + 1, N_SIZE_CLASSES), GROUND_CODE, dtype=np.uint8)
+        for status in (FINE, BURNING, BURNED):
+            color = (biome.tree_color or colors["Fine"]) if status == FINE else colors[STATUS_NAMES[status]]
+            for size in range(N_SIZE_CLASSES):
+                self.tree_codes[status, size] = len(self.entries)
+                self.entries.append({"Color": color, "Image": f"{images}/{TREE_IMAGES[size]}" if images else None})
+
+    def obstacle_code(self, status: str):
+        # Poças e outros obstáculos sem cor própria são desenhados como lagos
+        return OBSTACLE_CODES.get(status, OBSTACLE_CODES["Lake"])
+
+
+def agents_raster(model, palette: Palette):
+    '''
+    Código de cada célula do `ForestFire`, no formato (width * height), índice x * height + y.
+    Obstáculos ficam por cima das árvores, como na camada mais alta do desenho.
+    '''
+    codes = np.full(model.width * model.height, GROUND_CODE, dtype=np.uint8)
+    tree_cells, tree_status, tree_size = [], [], []
+    obstacles = []
+    height = model.height
+    # Só as células com árvore ou obstáculo (ver `GroundLayer`); as demais são terra
+    covered = np.flatnonzero(model.ground.cover)
+    for flat in covered.tolist():
+        pos = divmod(flat, height)
+        tree = model.cells.vegetation(pos)
+        if tree is not None:
+            tree_cells.append(flat)
+            tree_status.append(tree._status)
+            tree_size.append(tree.size)
+        obstacle = model.cells.obstacle(pos)
+        if obstacle is not None:
+            obstacles.append((flat, obstacle.status))
+    if tree_cells:
+        codes[tree_cells] = palette.tree_codes[tree_status, size_class(np.array(tree_size))]
+    for flat, status in obstacles:
+        codes[flat] = palette.obstacle_code(status)
+    return codes
+
+
+def array_raster(model, palette: Palette):
+    '''Código de cada célula do `ForestFireArray`: a vegetação, ou o terreno nas células vazias.'''
+    codes = np.where(model.status != EMPTY,
+                     palette.tree_codes[model.status, size_class(model.size)],
+                     TERRAIN_CODES[model.terrain])
+    return codes.astype(np.uint8).ravel()
+
+
+def overlays(model):
+    '''
+    Nuvens e bombeiros, desenhados por cima do raster.
+
+    Returns:
+        - clouds (list[list]): [x, y, raio, carregada] de cada nuvem
+        - firemen (list[list]): [x, y] de cada bombeiro
+    '''
+    if hasattr(model, "cloud_pos"):
+        clouds = [[int(x), int(y), int(size), bool(size > 5)] for (x, y), size in zip(model.cloud_pos, model.cloud_size)]
+        firemen = [[int(x), int(y)] for x, y in model.fireman_pos]
+    else:
+        clouds = [[x, y, cloud.size, bool(cloud.full)] for (x, y), cell in model.cells.occupied_cells(AIR) for cloud in cell]
+        firemen = [list(fireman.pos) for fireman in model.firemen if fireman.pos is not None]
+    return clouds, firemen
+
+
+def _digits(values):
+    '''Número de dígitos decimais de cada inteiro não negativo.'''
+    return np.floor(np.log10(np.maximum(values, 1))).astype(np.int64) + 1
+
+
+def delta_bytes(cells, codes):
+    '''Tamanho, no JSON, das listas de células e de códigos de um quadro de mudanças.'''
+    # Dígitos de cada número, mais o separador ", " do JSON: dois números por célula
+    return int(_digits(cells).sum() + _digits(codes).sum() + 2 * 2 * len(cells))
+
+
+class RasterGrid(VisualizationElement):
+    '''
+    Elemento do servidor que desenha o grid como raster, mandando ao navegador só as células
+    que mudaram desde o último quadro.
+
+    Params:
+        - colors (dict)
+            Cores de cada status, como `COLORS` de server.py
+        - canvas_width, canvas_height (int)
+            Tamanho da tela em pixels
+    '''
+    local_includes = ["js/RasterModule.js"]
+    local_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+    def __init__(self, colors: dict, canvas_width: int = 500, canvas_height: int = 500):
+        self.canvas_width = canvas_width
+        self.canvas_height = canvas_height
+        self.palettes = {biome.code: Palette(biome, colors) for biome in biomes.values()}
+        # Tamanho da paleta no JSON, mandada com cada quadro completo
+        self.palette_bytes = {code: len(json.dumps(palette.entries)) for code, palette in self.palettes.items()}
+        overlay_colors = json.dumps({name: colors[name] for name in ("Cloud", "heavy cloud", "Fireman")})
+        self.js_code = f"elements.push(new RasterModule({canvas_width}, {canvas_height}, {overlay_colors}));"
+        self._model = None
+        self._codes = None
+
+    def raster(self, model):
+        palette = self.palettes[model.biome.code]
+        if hasattr(model, "terrain"):
+            return palette, array_raster(model, palette)
+        return palette, agents_raster(model, palette)
+
+    def render(self, model):
+        palette, codes = self.raster(model)
+        clouds, firemen = overlays(model)
+        frame = {"clouds": clouds, "firemen": firemen}
+
+        changed = None
+        if model is self._model and self._codes is not None:
+            changed = np.flatnonzero(codes != self._codes)
+            full_bytes = 4 * -(-len(codes) // 3) + self.palette_bytes[model.biome.code]
+            if delta_bytes(changed, codes[changed]) >= full_bytes:
+                changed = None
+
+        if changed is None:
+            # Quadro completo: a paleta e o código de cada célula, em base64
+            frame.update({"type": "full", "width": model.width, "height": model.height, "palette": palette.entries,
+                          "codes": base64.b64encode(codes.tobytes()).decode()})
+        else:
+            frame.update({"type": "delta", "cells": changed.tolist(), "codes": codes[changed].tolist()})
+
+        self._model = model
+        self._codes = codes
+        return frame
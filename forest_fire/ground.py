@@ -1,20 +1,62 @@
-from mesa import Agent
+import numpy as np
+from forest_fire.layers import GROUND
 
-class Terra(Agent):
+class Terra:
     """
-    O agente terra preenche todo o grid.
-    Ele altera sua cor dependendo do status da árvore sobre ele.
+    A terra preenche todo o grid, por baixo dos demais agentes.
+    Ela não é um agente do grid: é uma vista da camada de terra (`GroundLayer`) numa célula,
+    criada quando alguém precisa dela. A cor e o diretório das imagens são os do bioma do modelo.
     """
-    def __init__(self, pos, model, color, img_path: str = None):
-        super().__init__(pos, model)
+    __slots__ = ("pos", "model")
+    layer = GROUND
+    status = "Terra"
+    burnable = False
+
+    def __init__(self, pos, model):
         self.pos = pos
-        self.img_path = img_path
-        self.color = color  # Cor padrão da terra (terra nua)
-        self.status = "Terra"
-        self.burnable = False
+        self.model = model
+
+    @property
+    def color(self):
+        return self.model.biome.ground_color  # Cor padrão da terra (terra nua)
+
+    @property
+    def img_path(self):
+        return self.model.biome.img_path
     
     def get_image(self):
         return f"{self.img_path}/terra.png"
     
     def step(self):
-        pass
\ No newline at end of file
+        pass
+
+
+class GroundLayer:
+    """
+    Camada de terra implícita do grid: toda célula tem terra, sem um agente por célula.
+
+    Guarda quantas árvores e obstáculos cobrem cada célula (índice x * height + y), para contar as
+    células de terra nua (a coluna "Terra" do `datacollector`) sem percorrer o grid.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.cover = np.zeros(model.width * model.height, dtype=np.int16)
+        self.bare_cells = model.width * model.height  # Células sem árvore nem obstáculo
+
+    def __getitem__(self, pos):
+        """A terra da célula `pos`."""
+        return Terra(pos, self.model)
+
+    def covers(self, pos):
+        """Se a célula tem terra: qualquer célula dentro do grid."""
+        return not self.model.grid.out_of_bounds(pos)
+
+    def cover_changed(self, pos, delta):
+        """Soma `delta` árvores ou obstáculos à célula `pos`."""
+        flat = pos[0] * self.model.height + pos[1]
+        before = self.cover[flat]
+        self.cover[flat] = before + delta
+        if before == 0:
+            self.bare_cells -= 1
+        elif before + delta == 0:
+            self.bare_cells += 1
@@ -0,0 +1,97 @@
+'''
+Execução sem visualização, com coleta de dados configurável.
+
+Os modelos (`ForestFire` e `ForestFireArray`) herdam `HeadlessRun`, que define `run`:
+
+    model = ForestFire("Caatinga", seed=1)
+    data = model.run(100, collect_every=0, reporters=["Burned", "CO2(Kg)"])
+
+Com `collect_every=k`, os dados só são coletados a cada k passos (e sempre no último); com
+`collect_every=0`, só no último, sem a linha do estado inicial que o modelo coleta ao ser criado
+(usada pelos gráficos do servidor). Com `reporters`, só essas colunas são calculadas. O DataFrame
+devolvido é indexado pelo passo.
+'''
+
+
+class HeadlessRun:
+    '''
+    Coleta de dados com período e colunas configuráveis, e o método `run`.
+    Cada modelo define `collect`, `_make_datacollector` e `fire_extinguished`.
+    '''
+
+    def _init_collection(self):
+        self.collect_every = 1 # Coleta a cada tantos passos (0: só quando pedido, como no fim do `run`)
+        self.reporters = None # Colunas coletadas (None: todas)
+        self.collected_steps = [] # Passo de cada linha coletada
+
+    def _selected_reporters(self, model_reporters: dict):
+        '''Só os reporters escolhidos em `reporters`, na ordem em que foram pedidos.'''
+        if self.reporters is None:
+            return model_reporters
+        unknown = [name for name in self.reporters if name not in model_reporters]
+        if unknown:
+            raise ValueError(f"Reporters desconhecidos: {unknown}. Disponíveis: {list(model_reporters)}")
+        return {name: model_reporters[name] for name in self.reporters}
+
+    def select_reporters(self, reporters):
+        '''
+        Passa a coletar só as colunas `reporters` (None: todas). O histórico das colunas que
+        continuam é mantido; o das demais é descartado.
+        '''
+        self.reporters = None if reporters is None else list(reporters)
+        history = self.datacollector.model_vars
+        tables = self.datacollector.tables
+        self.datacollector = self._make_datacollector()
+        for name in self.datacollector.model_vars:
+            self.datacollector.model_vars[name] = history.get(name, [None] * len(self.collected_steps))
+        self.datacollector.tables = tables
+
+    def _discard_collected(self):
+        '''Descarta as linhas já coletadas (as tabelas, como a de fases do profiler, são mantidas).'''
+        for values in self.datacollector.model_vars.values():
+            values.clear()
+        self.collected_steps.clear()
+
+    def _collect_if_due(self):
+        '''Coleta os dados do passo atual se ele cai no período `collect_every`.'''
+        if self.collect_every > 0 and self.schedule.steps % self.collect_every == 0:
+            self.collect()
+
+    def run(self, n_steps: int, collect_every: int = 1, reporters=None, stop_when_extinguished: bool = True):
+        '''
+        Roda até `n_steps` passos sem visualização.
+
+        Params:
+            - n_steps (int)
+                Número máximo de passos
+            - collect_every (int)
+                Coleta os dados a cada tantos passos (0: só no último, sem o estado inicial)
+            - reporters (list[str] | None)
+                Colunas coletadas (None: todas)
+            - stop_when_extinguished (bool)
+                Para assim que nenhuma célula estiver em chamas
+
+        Returns:
+            - data (pd.DataFrame): Dados coletados, indexados pelo passo
+        '''
+        if reporters is not None:
+            self.select_reporters(reporters)
+        self.collect_every = collect_every
+        if collect_every == 0 and self.collected_steps == [0]:
+            self._discard_collected()
+
+        for _ in range(n_steps):
+            if not self.running:
+                break
+            self.step()
+            if stop_when_extinguished and self.fire_extinguished():
+                break
+
+        # O último passo é sempre coletado
+        if not self.collected_steps or self.collected_steps[-1] != self.schedule.steps:
+            self.collect()
+
+        data = self.datacollector.get_model_vars_dataframe()
+        data.index = self.collected_steps[:len(data)]
+        data.index.name = "Step"
+        return data
@@ -0,0 +1,70 @@
+'''
+Focos de incêndio aleatórios, que surgem a cada 5 passos nos biomas secos (umidade abaixo de 11 g/m³).
+
+Os pontos de ignição são sorteados diretamente, sem percorrer o grid:
+    - sem ponderação, de 1 a 8 células sorteadas uniformemente, como antes;
+    - com ponderação, o número de focos cresce com o perigo de incêndio do bioma (calor e secura)
+      e cada foco cai numa árvore saudável com probabilidade proporcional ao seu tamanho (combustível).
+
+Os modelos só criam uma árvore quando o foco cai em terra nua; uma árvore saudável na célula
+começa a queimar, e células com obstáculos ou árvores já em chamas ou queimadas são ignoradas.
+'''
+
+import numpy as np
+
+MAX_IGNITIONS = 8
+DRY_HUMIDITY = 11  # Umidade (g/m³) abaixo da qual surgem focos aleatórios
+REFERENCE_TEMPERATURE = 25  # Temperatura (°C) a partir da qual o calor aumenta o perigo
+HOT_TEMPERATURE = 40  # Temperatura (°C) de perigo máximo
+MAX_ATTEMPTS = 100  # Tentativas do sorteio ponderado por foco, para grids quase sem árvores
+
+
+def fire_danger(biome):
+    '''
+    Perigo de incêndio do bioma, de 0 a 1: a média do calor e da secura, cada um entre 0 e 1.
+    '''
+    heat = (biome.temperature - REFERENCE_TEMPERATURE) / (HOT_TEMPERATURE - REFERENCE_TEMPERATURE)
+    dryness = 1 - biome.humidity / DRY_HUMIDITY
+    return (min(max(heat, 0), 1) + min(max(dryness, 0), 1)) / 2
+
+
+def ignition_count(rng, biome, weighted: bool = False):
+    '''Número de focos: de 1 a 8, uniforme ou crescendo com o perigo de incêndio do bioma.'''
+    if weighted:
+        return 1 + int(rng.binomial(MAX_IGNITIONS - 1, fire_danger(biome)))
+    return int(rng.integers(1, MAX_IGNITIONS, endpoint=True))
+
+
+def ignition_points(rng, biome, width: int, height: int, weighted: bool = False, fine_cells=None, fuel=None):
+    '''
+    Sorteia as células dos focos, como índices planos x * height + y (podem se repetir).
+
+    Params:
+        - rng (np.random.Generator)
+        - weighted (bool)
+            Pondera o número de focos pelo perigo de incêndio e as células pelo combustível
+        - fine_cells (np.ndarray)
+            Árvores saudáveis por célula (índice plano); só usado com ponderação
+        - fuel (Callable)
+            Tamanho da árvore saudável de uma célula (índice plano); só usado com ponderação
+
+    Returns:
+        - cells (list[int])
+    '''
+    count = ignition_count(rng, biome, weighted)
+    if not weighted:
+        return rng.integers(0, width * height, count).tolist()
+
+    # Amostragem por rejeição: uma árvore saudável ao acaso, aceita com probabilidade tamanho / teto
+    candidates = np.flatnonzero(fine_cells)
+    if len(candidates) == 0:
+        return []
+    ceiling = biome.size.mean_value + 3 * biome.size.standard_deviation
+    cells = []
+    for _ in range(count * MAX_ATTEMPTS):
+        cell = int(candidates[rng.integers(len(candidates))])
+        if rng.random() * ceiling < fuel(cell):
+            cells.append(cell)
+            if len(cells) == count:
+                break
+    return cells
@@ -0,0 +1,131 @@
+import numpy as np
+from scipy import ndimage
+
+# Códigos de terreno de cada célula
+GROUND = 0
+LAKE = 1
+CORRIDOR = 2
+OBSTACLE = 3
+
+# Códigos de estado da vegetação de cada célula
+EMPTY = 0
+FINE = 1
+BURNING = 2
+BURNED = 3
+
+STATUS_NAMES = {FINE: "Fine", BURNING: "Burning", BURNED: "Burned"}
+TERRAIN_NAMES = {LAKE: "Lake", CORRIDOR: "Corridor", OBSTACLE: "Obstacle"}
+
+
+def fire_positions(model):
+    '''
+    Sorteia (ou posiciona) os focos iniciais de incêndio, como em `ForestFire`.
+
+    Returns:
+        - mask (np.ndarray): Máscara booleana (width, height) dos focos iniciais
+    '''
+    mask = np.zeros((model.width, model.height), dtype=bool)
+    if model.random_fire:
+        g = model.random.randint(1, 7)
+        for _ in range(g):
+            mask[model.random.randint(0, model.width-1), model.random.randint(0, model.height-1)] = True
+    elif model.position_fire == "Left":
+        mask[0, :model.height-1] = True
+    elif model.position_fire == "Right":
+        mask[model.width-1, :model.height-1] = True
+    elif model.position_fire == "Bottom":
+        mask[:model.width-1, 0] = True
+    elif model.position_fire == "Top":
+        mask[:model.width-1, model.height-1] = True
+    elif model.position_fire == "Middle":
+        mask[max(model.width//2-5, 0):model.width//2+5, max(model.height//2-5, 0):model.height//2+5] = True
+    return mask
+
+
+def organic_lake(model, rng):
+    '''
+    Gera um lago orgânico: um losango de raio `water_density * 50` em torno de um centro aleatório,
+    recortado por um campo de ruído suavizado.
+
+    Returns:
+        - mask (np.ndarray): Máscara booleana (width, height) das células do lago
+    '''
+    lake_size = int(model.water_density * 50)
+    x, y = rng.integers(0, model.width), rng.integers(0, model.height)
+
+    noise_field = rng.standard_normal((model.width, model.height)) * 0.1
+    smoothed_noise = ndimage.convolve(noise_field, np.ones((3, 3)) / 9, mode='reflect')
+
+    xs, ys = np.ogrid[:model.width, :model.height]
+    diamond = (np.abs(xs - x) + np.abs(ys - y)) <= lake_size
+    mask = diamond & (smoothed_noise > 1e-15)
+    mask[x, y] = True
+    return mask
+
+
+def generate(model, rng):
+    '''
+    Gera toda a paisagem de uma vez, com sorteios vetorizados.
+    Segue as mesmas regras de `ForestFire._initialize_trees`: cada célula tem uma árvore com
+    probabilidade `tree_density`; senão, pode virar um lago individual ou um corredor/obstáculo.
+
+    Params:
+        - model (ForestFire | ForestFireArray)
+            Modelo com os parâmetros da paisagem
+        - rng (np.random.Generator)
+            Gerador usado nos sorteios
+
+    Returns:
+        - terrain (np.ndarray): Código de terreno de cada célula (int8)
+        - status (np.ndarray): Código de estado da vegetação de cada célula (int8)
+        - size (np.ndarray): Tamanho da árvore de cada célula (float32, 0 sem árvore)
+    '''
+    shape = (model.width, model.height)
+    fire = fire_positions(model)
+
+    lakes = np.zeros(shape, dtype=bool)
+    for _ in range(model.num_of_lakes):
+        lakes |= organic_lake(model, rng)
+
+    trees = rng.random(shape) < model.tree_density
+    others = ~trees
+    if model.individual_lakes:
+        individual = others & (rng.random(shape) < model.water_density**2)
+        lakes |= individual
+        others &= ~individual
+
+    # Sorteio entre nada, corredor e obstáculo, como em `_initialize_other_agent`, só entre os tipos
+    # habilitados (sem nenhum peso, nenhuma célula vira corredor ou obstáculo)
+    corridor_weight = model.corridor_density if model.corridor else 0
+    obstacle_weight = model.obstacles_density if model.obstacles else 0
+    none_weight = max(1 - corridor_weight - obstacle_weight, 0)
+    total = none_weight + corridor_weight + obstacle_weight
+    corridors = np.zeros(shape, dtype=bool)
+    obstacles = np.zeros(shape, dtype=bool)
+    if total > 0 and (corridor_weight > 0 or obstacle_weight > 0):
+        draw = rng.random(shape) * total
+        if corridor_weight > 0:
+            corridors = others & (draw >= none_weight) & (draw < none_weight + corridor_weight)
+        if obstacle_weight > 0:
+            obstacles = others & (draw >= none_weight + corridor_weight)
+
+    # Em biomas secos, alguns corredores já começam como árvores em chamas
+    if model.biome.humidity < 11:
+        ignited = corridors & (rng.random(shape) < 0.01)
+        corridors &= ~ignited
+        trees |= ignited
+        fire |= ignited
+
+    terrain = np.full(shape, GROUND, dtype=np.int8)
+    terrain[obstacles] = OBSTACLE
+    terrain[corridors] = CORRIDOR
+    terrain[lakes] = LAKE
+
+    trees &= ~lakes
+    status = np.full(shape, EMPTY, dtype=np.int8)
+    status[trees] = FINE
+    status[trees & fire] = BURNING
+
+    size = np.zeros(shape, dtype=np.float32)
+    size[trees] = model.biome.size.sample(rng, np.count_nonzero(trees))
+    return terrain, status, size
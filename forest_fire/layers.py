@@ -0,0 +1,111 @@
+'''
+Conteúdo das células do `ForestFire` separado por camada, para consultas sem percorrer o grid.
+
+Cada agente declara a sua camada no atributo de classe `layer`:
+    - GROUND: a terra, implícita em toda célula (ver `GroundLayer`);
+    - VEGETATION: no máximo uma árvore por célula;
+    - OBSTACLE: no máximo um lago, corredor ou obstáculo por célula;
+    - AIR: nuvens, várias por célula;
+    - UNITS: bombeiros, vários por célula.
+
+As camadas de um só agente por célula são listas indexadas por x * height + y, então "qual árvore
+(ou obstáculo) está em (x, y)" é uma consulta direta, sem filtrar por tipo. As camadas de vários
+agentes são dicionários esparsos posição -> agentes (dicionário usado como conjunto ordenado).
+
+O `MultiGrid` do mesa continua sendo atualizado junto, para quem usa a sua interface.
+'''
+
+GROUND, VEGETATION, OBSTACLE, AIR, UNITS = range(5)
+LAYER_NAMES = {GROUND: "ground", VEGETATION: "vegetation", OBSTACLE: "obstacle", AIR: "air", UNITS: "units"}
+
+SINGLE_LAYERS = (VEGETATION, OBSTACLE)
+MULTI_LAYERS = (AIR, UNITS)
+
+
+class CellLayers:
+    '''
+    Camadas de um grid (width, height). A terra fica na `GroundLayer` do modelo, passada em `ground`.
+    '''
+
+    def __init__(self, width: int, height: int, ground=None):
+        self.width = width
+        self.height = height
+        self.ground = ground
+        self._single = {layer: [None] * (width * height) for layer in SINGLE_LAYERS}
+        self._multi = {layer: {} for layer in MULTI_LAYERS}
+
+    def _flat(self, pos):
+        return pos[0] * self.height + pos[1]
+
+    def place(self, agent, pos):
+        '''Coloca o agente na célula `pos` da sua camada.'''
+        layer = agent.layer
+        if layer in SINGLE_LAYERS:
+            cells = self._single[layer]
+            flat = self._flat(pos)
+            if cells[flat] is not None:
+                raise ValueError(f"A camada {LAYER_NAMES[layer]} já tem um agente em {pos}")
+            cells[flat] = agent
+        elif layer in MULTI_LAYERS:
+            self._multi[layer].setdefault(pos, {})[agent] = None
+
+    def remove(self, agent):
+        '''Tira o agente da sua camada, na sua posição atual.'''
+        layer = agent.layer
+        if layer in SINGLE_LAYERS:
+            self._single[layer][self._flat(agent.pos)] = None
+        elif layer in MULTI_LAYERS:
+            cells = self._multi[layer]
+            agents = cells[agent.pos]
+            del agents[agent]
+            if not agents:
+                del cells[agent.pos]
+
+    def move(self, agent, pos):
+        '''Move o agente para `pos` na sua camada (antes de atualizar `agent.pos`).'''
+        self.remove(agent)
+        self.place(agent, pos)
+
+    def get(self, layer: int, pos):
+        '''
+        Conteúdo da camada na célula: o agente (ou None) nas camadas de um só agente, a lista de
+        agentes nas demais e a terra na camada GROUND.
+        '''
+        if layer in SINGLE_LAYERS:
+            return self._single[layer][self._flat(pos)]
+        if layer in MULTI_LAYERS:
+            return list(self._multi[layer].get(pos, ()))
+        return self.ground[pos]
+
+    def vegetation(self, pos):
+        '''A árvore da célula, ou None.'''
+        return self._single[VEGETATION][self._flat(pos)]
+
+    def obstacle(self, pos):
+        '''O lago, corredor ou obstáculo da célula, ou None.'''
+        return self._single[OBSTACLE][self._flat(pos)]
+
+    def clouds(self, pos):
+        '''Nuvens da célula.'''
+        return self._multi[AIR].get(pos, ())
+
+    def units(self, pos):
+        '''Bombeiros da célula.'''
+        return self._multi[UNITS].get(pos, ())
+
+    def occupied(self, pos):
+        '''Se a célula tem árvore ou obstáculo, isto é, se não é só terra.'''
+        flat = self._flat(pos)
+        return self._single[VEGETATION][flat] is not None or self._single[OBSTACLE][flat] is not None
+
+    def contents(self, pos):
+        '''Agentes da célula, camada por camada (sem a terra).'''
+        agents = [self._single[layer][self._flat(pos)] for layer in SINGLE_LAYERS]
+        agents = [agent for agent in agents if agent is not None]
+        for layer in MULTI_LAYERS:
+            agents.extend(self._multi[layer].get(pos, ()))
+        return agents
+
+    def occupied_cells(self, layer: int):
+        '''Posições com agentes numa camada de vários agentes, e os agentes de cada uma.'''
+        return self._multi[layer].items()
@@ -1,15 +1,27 @@
 import mesa
+import math
+from collections import Counter
 from typing import Literal
 from forest_fire.cloud import Cloud
-from forest_fire.tree import Tree, Terra
+from forest_fire.tree import Tree
+from forest_fire.ground import GroundLayer
 from forest_fire.biome import biomes
+from forest_fire.stats import ExactSum
 from forest_fire.fireman import Fireman
 from forest_fire.obstacles import Lake, Corridor, Obstacle
-import random
+from forest_fire.schedule import FrontierActivation
+from forest_fire.neighbourhood import NeighbourhoodIndex
+from forest_fire.clusters import BurnClusters
+from forest_fire.layers import CellLayers, AIR
+from forest_fire import landscape, checkpoint, dispatch, ignition
+from forest_fire.seeds import seed_random
+from forest_fire.headless import HeadlessRun
+from forest_fire.profiling import StepProfiler, PHASES_TABLE, PHASES_COLUMNS
+from forest_fire.landscape import LAKE, CORRIDOR, OBSTACLE, EMPTY, BURNING
 import numpy as np
 from scipy import ndimage
 
-class ForestFire(mesa.Model):
+class ForestFire(HeadlessRun, mesa.Model):
     def __init__(
         self,
         biome_name: Literal["Default"], 
@@ -34,10 +46,14 @@ class ForestFire(mesa.Model):
         individual_lakes=True,
         reprod_speed=1, 
         wind_direction="N",  # Direção do vento: "none", "north", "south", "east", "west"
-        wind_intensity=0.5  # Intensidade do vento: 0 (sem vento) a 1 (vento muito forte)
-        
+        wind_intensity=0.5,  # Intensidade do vento: 0 (sem vento) a 1 (vento muito forte)
+        weighted_ignition=False,  # Focos aleatórios ponderados por perigo de incêndio e combustível (ver ignition.py)
+        debug=False,  # Confere os contadores com uma contagem completa a cada coleta
+        profile=False,  # Mede o tempo de cada fase do passo (ver profiling.py)
+        seed=None  # Semente de todos os sorteios do modelo (None: sorteia uma semente nova)
     ):
         super().__init__()
+        seed_random(self, seed)
 
         # Recupera o bioma escolhido
         self.biome = biomes[biome_name]
@@ -65,166 +81,109 @@ class ForestFire(mesa.Model):
         
         self.wind_direction = wind_direction
         self.wind_intensity = wind_intensity 
-        self.schedule = mesa.time.RandomActivation(self)
+        self.weighted_ignition = weighted_ignition
+        self.debug = debug
+        self.profiler = StepProfiler(profile)
+        self.schedule = FrontierActivation(self)
         self.grid = mesa.space.MultiGrid(self.width, self.height, torus=False)
         
-        self.num_fine_trees = 0
+        # Contadores mantidos a cada mudança, para a coleta de dados não percorrer todos os agentes
+        self.agent_counts = Counter()  # Agentes no agendador por classe
+        self.status_counts = Counter()  # Árvores por status
+        # Totais de CO2 somados sem erro de arredondamento, para ficarem iguais à contagem completa
+        self.CO2_emission_total = ExactSum()
+        self.CO2_sequestered_total = ExactSum()
+        # Vizinhanças de reprodução pré-calculadas e número de árvores saudáveis por célula (índice x * height + y)
+        self.neighbourhood = NeighbourhoodIndex.for_shape(self.width, self.height)
+        self.fine_trees = np.zeros(self.width * self.height, dtype=np.int16)
+        self.burning = {} # Fronteira do fogo: árvores em chamas (dicionário usado como conjunto ordenado)
+        self.burning_cells = np.zeros(self.width * self.height, dtype=np.int16)  # Árvores em chamas por célula
+        self.clusters = BurnClusters(self.width, self.height)  # Áreas queimadas contínuas (ver clusters.py)
+        self.firemen = []
+        self.regrowth = {} # Células a replantar ou limpar no fim do passo: posição -> (agente, replantar)
+        self.tree_pool = [] # Árvores retiradas do grid, reaproveitadas pelas árvores novas
         
-        self.datacollector = mesa.DataCollector(
-            model_reporters={
-                "Fine": lambda model: self.count_type(model, "Fine", agent_type=Tree),
-                "Burning": lambda model: self.count_type(model, "Burning", agent_type=Tree),
-                "Burned": lambda model: self.count_type(model, "Burned", agent_type=Tree),
-                "Terra": lambda model: self.count_type(model, agent_type=Terra),  # Conta o número de agentes do tipo Terra
-                "Total": lambda model: self.count_type(model, agent_type=Tree),  # Conta o número total de árvores
-                "Clouds": lambda model: self.count_type(model, agent_type=Cloud),
-                "CO2(Kg)": lambda model: self.count_CO2(model)
-            }
-        )   
-
-        # Inicializa o grid com terra
-        for contents, (x, y) in self.grid.coord_iter():
-            color = self.biome.ground_color
-            img_path = self.biome.img_path
-            terra_agent = Terra((x, y), self, color, img_path)
-            self.grid.place_agent(terra_agent, (x, y))
-
-        self._initialize_trees()
+        self._init_collection()
+        self.datacollector = self._make_datacollector()
+
+        # Toda célula tem terra: uma camada implícita, sem um agente por célula
+        self.ground = GroundLayer(self)
+        # Conteúdo de cada célula por camada: árvore, obstáculo, nuvens e bombeiros (ver layers.py)
+        self.cells = CellLayers(self.width, self.height, self.ground)
+
+        self._initialize_landscape()
         
         if rainy_season:
             self._initialize_clouds(cloud_quantity)   #TODO associar a biomas 
         self._initialize_firemen(fireman_quantity)
 
         # Coleta os dados iniciais
-        self.datacollector.collect(self)
+        self.collect()
 
-    def _initialize_trees(self):
-        fire_list = [] 
+    def _make_datacollector(self):
+        return mesa.DataCollector(
+            model_reporters=self._selected_reporters({
+                "Fine": lambda model: model.status_counts["Fine"],
+                "Burning": lambda model: model.status_counts["Burning"],
+                "Burned": lambda model: model.status_counts["Burned"],
+                "Terra": lambda model: model.ground.bare_cells,  # Conta as células de terra nua
+                "Total": lambda model: model.agent_counts[Tree],  # Conta o número total de árvores
+                "Clouds": lambda model: model.agent_counts[Cloud],
+                "CO2(Kg)": lambda model: model.CO2_balance(),
+                "Fire fronts": lambda model: model.clusters.fronts,
+                "Largest burned patch": lambda model: model.clusters.largest,
+                "Spanning": lambda model: model.clusters.spanning,
+            }),
+            tables={PHASES_TABLE: PHASES_COLUMNS}
+        )
 
-        if self.random_fire:
-            g = self.random.randint(1, 7)
-            for _ in range(g):
-                fire_list.append((self.random.randint(0, self.width-1),
-                                self.random.randint(0, self.height-1)))
-        else:
-            if self.position_fire == "Left":
-                fire_list = [(0, y) for y in range(self.height-1)]
-            elif self.position_fire == "Right":
-                fire_list = [(self.width - 1, y) for y in range(self.height-1)]
-            elif self.position_fire == "Bottom":
-                fire_list = [(x, 0) for x in range(self.width-1)]
-            elif self.position_fire == "Top":
-                fire_list = [(x, self.height - 1) for x in range(self.width-1)]
-            elif self.position_fire == "Middle":
-                fire_list = [(x, y) for x in range(self.width//2-5,self.width//2+5) for y in range(self.height//2-5, self.height//2+5)]
-
-        for _ in range(self.num_of_lakes):
-            self._initialize_lake_organic()
-
-        for _contents, pos in self.grid.coord_iter():
-            size = self.biome.size.sort_value() # Tamanho da árvore conforme o bioma
-            color = self.biome.tree_color  # Cor do bioma para a árvore
-            img_path = self.biome.img_path # Diretório das imagens do bioma
-            
-            if self.random.random() < self.tree_density:
-                agent = Tree(self.next_id(), self, pos, size, color, self.tree_density, img_path, self.reprod_speed)
-                if agent.pos in fire_list:   
-                    agent.status = "Burning"
-                else:
-                    self.num_fine_trees += 1
-                
-                lakes_in_cell = self.get_cell_items([pos], [Lake])
-                if len(lakes_in_cell) == 0:
-                    self.grid.place_agent(agent, pos)
-                    self.schedule.add(agent)
-                
-            elif self.individual_lakes and random.random() < self.water_density**2:
-                self._initialize_water(pos)
-                
-            else:
-                self._initialize_other_agent(pos)
-                    
-    def _initialize_other_agent(self, pos):
-        def get_types_and_weights():
-            none_weight = max(1-self.corridor_density-self.obstacles_density, 0)
-            types = ["None", "Corridor", "Obstacle"]
-            weights_list = [none_weight, self.corridor_density, self.obstacles_density]
-            if not self.obstacles:
-                types.remove("Obstacle")
-                weights_list.pop()
-            if not self.corridor:
-                types.remove("Corridor")
-                weights_list.pop()
-            return types, weights_list
-            
-        types, weights_list = get_types_and_weights()
-            
-        agent_type = random.choices(types, weights=weights_list)[0]
-        match agent_type:
-            case "Corridor":
-                self._initialize_corridor(pos, self.corridor_radius)
-            case "Obstacle":
-                self._initialize_obstacle(pos)
-            case "None":
-                 pass
+    def __getstate__(self):
+        """Estado para o checkpoint (ver checkpoint.py): do coletor de dados, guarda só o histórico."""
+        state = self.__dict__.copy()
+        state["datacollector"] = checkpoint.collected_data(self.datacollector)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.datacollector = self._make_datacollector()
+        checkpoint.restore_collected_data(self.datacollector, state["datacollector"])
+
+    def save_checkpoint(self, path: str):
+        """Grava o estado completo do modelo, para continuar a simulação depois com `checkpoint.load`."""
+        checkpoint.save(self, path)
+
+    def _initialize_landscape(self):
+        """
+        Gera toda a paisagem com sorteios vetorizados (ver `landscape.generate`) e cria os agentes
+        de lagos, corredores, obstáculos e árvores numa única passada pelas células ocupadas.
+        """
+        terrain, status, size = landscape.generate(self, self.rng)
+
+        for x, y in np.argwhere(terrain == LAKE).tolist():
+            self._initialize_water((x, y))
+        for x, y in np.argwhere(terrain == CORRIDOR).tolist():
+            self._initialize_corridor((x, y), self.corridor_radius)
+        for x, y in np.argwhere(terrain == OBSTACLE).tolist():
+            self._initialize_obstacle((x, y))
+
+        trees = np.argwhere(status != EMPTY)
+        for (x, y), tree_size, tree_status in zip(trees.tolist(), size[status != EMPTY].tolist(), status[status != EMPTY].tolist()):
+            agent = Tree(self.next_id(), self, (x, y), tree_size)
+            self.place_agent(agent, (x, y))
+            if tree_status == BURNING:
+                agent.status = "Burning"
             
     def _initialize_water(self, pos):
         water = Lake(self.next_id(), self, pos)
-        self.grid.place_agent(water, pos)
-        self.schedule.add(water)
-            
-    def _initialize_lake(self):
-        self.lake_size = int(self.water_density*50)
-        x, y = random.randint(0, self.width - 1), random.randint(0, self.height - 1)
-        center_lake = Lake(self.next_id(), self, (x, y))
-        self.schedule.add(center_lake)
-        self.grid.place_agent(center_lake, (x,y))
-        
-        for pos in self.grid.iter_neighborhood((x,y), moore=True, radius=self.lake_size):
-            lake = Lake(self.next_id(), self, pos)
-            self.schedule.add(lake)
-            self.grid.place_agent(lake, pos)
-
-    def _initialize_lake_organic(self):
-        self.lake_size = int(self.water_density * 50)
-        x, y = random.randint(0, self.width - 1), random.randint(0, self.height - 1)
-        center_lake = Lake(self.next_id(), self, (x, y))
-        self.schedule.add(center_lake)
-        self.grid.place_agent(center_lake, (x, y))
-
-        # Generate noise field using NumPy
-        noise_scale = 0.1
-        shape = (self.width, self.height)
-        noise_field = np.random.randn(*shape) * noise_scale
-
-        # Apply smoothing (optional)
-        smoothed_noise = ndimage.convolve(noise_field, np.ones((3, 3)) / 9, mode='reflect')
-
-        # Iterate through neighborhood and add lake cells based on noise
-        for pos in self.grid.iter_neighborhood((x, y), moore=False, radius=self.lake_size):
-            noise_value = smoothed_noise[pos[1]][pos[0]]
-            if noise_value > 1e-15:  # Adjust threshold for desired lake shape
-                lake = Lake(self.next_id(), self, pos)
-                self.grid.place_agent(lake, pos)           
-                self.schedule.add(lake)
+        self.place_agent(water, pos)
 
     def _initialize_obstacle(self, pos):
         obstacle = Obstacle(self.next_id(), self, pos)
-        self.schedule.add(obstacle)
-        self.grid.place_agent(obstacle, pos)
+        self.place_agent(obstacle, pos)
     
     def _initialize_corridor(self, pos, corridor_radius):
         corridor = Corridor(self.next_id(), self, pos, corridor_radius)
-        if self.biome.humidity < 11:
-            burning_probability = 0.01
-            if random.random() < burning_probability:
-                size = self.biome.size.sort_value() # Tamanho da árvore conforme o bioma
-                color = self.biome.tree_color  # Cor do bioma para a árvore
-                img_path = self.biome.img_path # Diretório das imagens do bioma
-                corridor = Tree(self.next_id(), self, pos, size, color, self.tree_density, img_path, self.reprod_speed)
-                corridor.status = "Burning"
-        self.schedule.add(corridor)
-        self.grid.place_agent(corridor, pos)
+        self.place_agent(corridor, pos)
 
     def _initialize_clouds(self, cloud_count):
         """Inicializa nuvens no grid com tamanhos e posições aleatórias."""
@@ -235,80 +194,242 @@ class ForestFire(mesa.Model):
             direction = self._get_wind_vector()
             cloud_size = self.random.randint(1,self.clouds_size)
             cloud = Cloud(self.next_id(), (x, y), self, size=cloud_size, color="gray", direction=direction, full=False, speed=self.wind_intensity)
-            self.schedule.add(cloud)
-            self.grid.place_agent(cloud, (x, y))
+            self.place_agent(cloud, (x, y))
     
     def _initialize_firemen(self, fireman_quantity=0):
         
         """
-        Inicializa um número especificado de bombeiros em células aleatórias,
-        garantindo que estejam posicionados em células com Terra ou Árvore.
+        Inicializa um número especificado de bombeiros em células aleatórias.
+        Toda célula do grid tem terra, então as posições são sorteadas de uma vez, sem tentativas.
         """
-        for i in range(fireman_quantity):
-            while True:  # Continua tentando até encontrar uma célula válida
-                x = self.random.randrange(self.grid.width)
-                y = self.random.randrange(self.grid.height)
-                pos = (x, y)
-                
-                # Verificar se a célula contém Terra ou Árvore
-                cell_contents = self.grid.get_cell_list_contents([pos])
-                if any(isinstance(agent, (Terra, Tree)) for agent in cell_contents):
-                    fireman = Fireman(unique_id=i, model=self, pos=pos)
-                    self.schedule.add(fireman)
-                    self.grid.place_agent(fireman, pos)
-                    break    
+        xs = self.rng.integers(0, self.width, fireman_quantity)
+        ys = self.rng.integers(0, self.height, fireman_quantity)
+        for x, y in zip(xs.tolist(), ys.tolist()):
+            fireman = Fireman(unique_id=self.next_id(), model=self, pos=(x, y))
+            self.place_agent(fireman, (x, y))
+            self.firemen.append(fireman)
+
+    def _dispatch_firemen(self):
+        """Atribui a cada bombeiro uma célula em chamas (ver dispatch.py)."""
+        fires = np.array([tree.pos for tree in self.burning], dtype=np.int64)
+        positions = np.array([fireman.pos for fireman in self.firemen], dtype=np.int64)
+        targets = dispatch.assign_targets(positions, fires)
+        for i, fireman in enumerate(self.firemen):
+            fireman.target = None if targets is None else (int(targets[i, 0]), int(targets[i, 1]))
+
+    def is_walkable(self, pos):
+        """Verifica se a célula tem terra ou árvore, por onde os bombeiros podem andar."""
+        return self.ground.covers(pos)
             
     def _random_fire(self):
         '''
-        Inicia um foco de incêndio
+        Inicia focos de incêndio em até 8 células (ver ignition.py).
+        Só cria uma árvore quando o foco cai em terra nua.
         '''
-        fire_list = [] 
+        cells = ignition.ignition_points(self.rng, self.biome, self.width, self.height, self.weighted_ignition,
+                                         self.fine_trees, self._fine_tree_size)
+        for cell in cells:
+            pos = divmod(cell, self.height)
+            if not self.ground.cover[cell]:
+                size = self.biome.size.sort_value(self.random) # Tamanho da árvore conforme o bioma
+                self.new_tree(pos, size).status = "Burning"
+            elif self.fine_trees[cell]:
+                self._fine_tree(pos).status = "Burning"
 
-        g = self.random.randint(1, 8)
-        for _ in range(g):
-            fire_list.append((self.random.randint(0, self.width-1),
-                            self.random.randint(0, self.height-1)))
-        
-        for _contents, pos in self.grid.coord_iter():
-            size = self.biome.size.sort_value() # Tamanho da árvore conforme o bioma
-            color = self.biome.tree_color  # Cor do bioma para a árvore
-            img_path = self.biome.img_path # Diretório das imagens do bioma  
-            
-            agent = Tree(self.next_id(), self, pos, size, color, self.tree_density, img_path, self.reprod_speed)
-            if agent.pos in fire_list:
-                self.schedule.add(agent)
-                self.grid.place_agent(agent, pos)
-                agent.status = "Burning"
+    def _fine_tree(self, pos):
+        return self.cells.vegetation(pos)
+
+    def _fine_tree_size(self, cell):
+        return self._fine_tree(divmod(cell, self.height)).size
             
+    def place_agent(self, agent, pos):
+        """Coloca o agente no grid e no agendador."""
+        self.grid.place_agent(agent, pos)
+        self.cells.place(agent, pos)
+        self.schedule.add(agent)
+        self.agent_counts[type(agent)] += 1
+        if isinstance(agent, (Tree, Obstacle)):
+            self.ground.cover_changed(pos, 1)
+        if isinstance(agent, Tree):
+            self.status_counts[agent.status] += 1
+            self.tree_CO2_changed(agent.CO2_emission, agent.CO2_sequestered)
+            if agent.status == "Fine":
+                self.fine_trees[self._flat(pos)] += 1
+            if agent.status == "Burning":
+                self.burning[agent] = None
+                self.burning_cells[self._flat(pos)] += 1
+                self.clusters.ignite(self._flat(pos))
+
+    def remove_agent(self, agent):
+        """Retira o agente do grid e do agendador."""
+        if isinstance(agent, (Tree, Obstacle)):
+            self.ground.cover_changed(agent.pos, -1)
+        if isinstance(agent, Tree):
+            self.status_counts[agent.status] -= 1
+            self.tree_CO2_changed(-agent.CO2_emission, -agent.CO2_sequestered)
+            if agent.status == "Fine":
+                self.fine_trees[self._flat(agent.pos)] -= 1
+            if agent.status == "Burning":
+                self.burning.pop(agent)
+                self.burning_cells[self._flat(agent.pos)] -= 1
+                self.clusters.extinguish(self._flat(agent.pos))
+        self.cells.remove(agent)
+        self.grid.remove_agent(agent)
+        self.schedule.remove(agent)
+        agent.remove()  # Tira o agente do registro do mesa, que guarda referências fortes
+        self.agent_counts[type(agent)] -= 1
+        if isinstance(agent, Tree):
+            self.tree_pool.append(agent)
+
+    def new_tree(self, pos, size):
+        """Coloca uma árvore saudável em `pos`, reaproveitando uma árvore retirada se houver."""
+        if self.tree_pool:
+            tree = self.tree_pool.pop()
+            tree.__init__(self.next_id(), self, pos, size)
+        else:
+            tree = Tree(self.next_id(), self, pos, size)
+        self.place_agent(tree, pos)
+        return tree
+
+    def queue_regrowth(self, agent, grow=True):
+        """
+        Marca a célula do agente para o replantio do fim do passo: crescer uma árvore
+        (`grow=True`) ou, para uma árvore queimada, virar terra. Crescer tem prioridade.
+        """
+        queued = self.regrowth.get(agent.pos)
+        if queued is None or (grow and not queued[1]):
+            self.regrowth[agent.pos] = (agent, grow)
+
+    def regrow(self):
+        """
+        Aplica de uma vez as mudanças marcadas no passo, no lugar, sem recriar agentes:
+            - árvore queimada a replantar: volta a ser saudável, com um novo tamanho;
+            - árvore queimada a limpar: sai do grid e vira terra;
+            - terra (ou célula só com nuvens e bombeiros) a replantar: recebe uma árvore nova.
+        Mudanças que deixaram de valer durante o passo (a árvore já não está queimada, a célula
+        ganhou uma árvore ou um obstáculo) são ignoradas.
+        """
+        queued, self.regrowth = self.regrowth, {}
+        for pos, (agent, grow) in queued.items():
+            if isinstance(agent, Tree):
+                if agent.pos != pos or agent.status != "Burned":
+                    continue
+                if grow:
+                    agent.regrow(self.biome.size.sort_value(self.random))
+                else:
+                    self.remove_agent(agent)
+            elif not self.ground.cover[self._flat(pos)]:
+                self.new_tree(pos, self.biome.size.sort_value(self.random))
+
+    def move_agent(self, agent, pos):
+        """Move o agente no grid e na sua camada."""
+        self.cells.move(agent, pos)
+        self.grid.move_agent(agent, pos)
+
+    def clouds_around(self, pos):
+        """Nuvens nas células vizinhas de `pos` (sem a própria célula), na ordem de `grid.get_neighbors`."""
+        return [cloud for cell in self.grid.get_neighborhood(pos, moore=True, include_center=False)
+                for cloud in self.cells.clouds(cell)]
+
+    def burning_trees_around(self, pos, radius):
+        """
+        Árvores em chamas a até `radius` células de `pos` (distância de Chebyshev), ordenadas por x e
+        depois por y. Só as células marcadas em `burning_cells` são consultadas.
+        """
+        x, y = pos
+        x0, y0 = max(x - radius, 0), max(y - radius, 0)
+        footprint = self.burning_cells.reshape(self.width, self.height)[x0:x + radius + 1, y0:y + radius + 1]
+        return [self.cells.vegetation((x0 + int(nx), y0 + int(ny))) for nx, ny in zip(*np.nonzero(footprint))]
+
+    def _flat(self, pos):
+        return pos[0] * self.height + pos[1]
+
+    @property
+    def num_fine_trees(self):
+        return self.status_counts["Fine"]
+
+    def tree_CO2_changed(self, emission, sequestered):
+        """Soma as variações de CO2 de uma árvore aos totais do modelo."""
+        if emission:
+            self.CO2_emission_total.add(emission)
+        if sequestered:
+            self.CO2_sequestered_total.add(sequestered)
+
+    def CO2_balance(self):
+        """CO2 emitido menos o sequestrado pelas árvores do modelo, em Kg."""
+        return (self.CO2_emission_total.value - self.CO2_sequestered_total.value) * self.biome.CO2_emission_factor
+
+    def tree_status_changed(self, tree, old_status):
+        """
+        Atualiza a fronteira do fogo quando uma árvore muda de status.
+        A árvore volta para a fronteira (ainda neste passo, se a sua vez vier depois; ver
+        `FrontierActivation.activate`) e, se deixou de estar saudável, as árvores saudáveis ao redor
+        também, pois podem voltar a se reproduzir.
+        """
+        self.status_counts[old_status] -= 1
+        self.status_counts[tree.status] += 1
+        if tree.status == "Burning":
+            self.burning[tree] = None
+            self.burning_cells[self._flat(tree.pos)] += 1
+            self.clusters.ignite(self._flat(tree.pos))
+        elif old_status == "Burning":
+            del self.burning[tree]
+            self.burning_cells[self._flat(tree.pos)] -= 1
+            self.clusters.extinguish(self._flat(tree.pos))
+
+        if tree.status == "Fine":
+            self.fine_trees[self._flat(tree.pos)] += 1
+
+        self.schedule.activate(tree)
+        if old_status == "Fine":
+            self.fine_trees[self._flat(tree.pos)] -= 1
+            first_level, second_level = self.neighbourhood.levels(tree.pos)
+            for pos in first_level + second_level:
+                if self.fine_trees[self._flat(pos)]:
+                    self.schedule.activate(self.cells.vegetation(pos))
+
     def get_cell_items(self, positions: list, types: list):
-        agents_in_cell = self.grid.get_cell_list_contents(positions)
-              
-        filtered_agents = []
-        for agent in agents_in_cell:
-            for tp in types:
-                if isinstance(agent, tp):
-                    filtered_agents.append(agent)
-        return filtered_agents
+        """
+        Agentes dos tipos `types` nas células `positions`, lidos das camadas (ver layers.py).
+        Para a árvore ou o obstáculo de uma célula, `cells.vegetation` e `cells.obstacle` são diretos.
+        """
+        types = tuple(types)
+        return [agent for pos in positions for agent in self.cells.contents(pos) if isinstance(agent, types)]
 
     def step(self):
         """
         Realiza um passo no modelo, atualizando os status das árvores.
         A cada passo, verifica as interações da árvore com a terra.
         """
+        profiler = self.profiler
         if self.wind_intensity != 0:
-            for agent in self.schedule.agents:
-                if agent.status == "Burning":
+            with profiler.phase("propagate_fire"):
+                for agent in list(self.burning):
                     self.propagate_fire(agent)
 
-        self.schedule.step()  # Avança o passo do modelo
-        self.datacollector.collect(self)  # Coleta dados após cada passo
+        if self.firemen:
+            with profiler.phase("dispatch"):
+                self._dispatch_firemen()
+
+        with profiler.phase("schedule.step"):
+            self.schedule.step()  # Avança o passo do modelo (também medido por classe de agente no agendador)
+        with profiler.phase("regrowth"):
+            self.regrow()
+        with profiler.phase("clusters"):
+            self.clusters.end_step()
+        with profiler.phase("datacollector"):
+            self._collect_if_due()  # Coleta dados após cada passo (ver `collect_every`)
         
         # Adiciona novas nuvens com tamanhos variados a cada 10 passos
         if self.rainy_season and self.schedule.steps % 10 == 0:
-            self._initialize_clouds(5)  # Adiciona 5 novas nuvens a cada 10 passos
+            with profiler.phase("clouds"):
+                self._initialize_clouds(5)  # Adiciona 5 novas nuvens a cada 10 passos
     
         if self.biome.humidity < 11 and self.schedule.steps % 5 == 0:
+            with profiler.phase("random_fire"):
                 self._random_fire()
+
+        profiler.end_step(self.datacollector, self.schedule.steps)
         
     def propagate_fire(self, agent):
         for neighbor in agent.model.grid.iter_neighbors(agent.pos, True):
@@ -321,13 +442,11 @@ class ForestFire(mesa.Model):
                 dy = neighbor.pos[1] - agent.pos[1]
 
                 if (dx, dy) == self._get_wind_vector():
-                    if random.randint(0, 100) > beta:
+                    if self.random.randint(0, 100) > beta:
                         neighbor.status = "Burning"
-                        self.num_fine_trees -= 1
                 else:
-                    if random.randint(0, 100) > alpha:
+                    if self.random.randint(0, 100) > alpha:
                         neighbor.status = "Burning"
-                        self.num_fine_trees -= 1
 
         # Cálculo de CO2 emitido na queima da árvore
         agent.CO2_emission = agent.size * 20 * 0.5 * 3.67 # Biomassa x 0.5 x 3.67
@@ -347,6 +466,62 @@ class ForestFire(mesa.Model):
             return (-1, 0)  # Para a esquerda
         return (0, 0)
     
+    def collect(self):
+        """Coleta os dados do passo; no modo debug, confere antes os contadores."""
+        if self.debug:
+            self.check_counters()
+        self.datacollector.collect(self)
+        self.collected_steps.append(self.schedule.steps)
+
+    def fire_extinguished(self):
+        """Se não há nenhuma árvore em chamas."""
+        return not self.burning
+
+    def check_counters(self):
+        """
+        Confere os contadores mantidos a cada mudança com uma contagem completa dos agentes.
+        """
+        expected = {
+            "Fine": (self.status_counts["Fine"], self.count_type(self, "Fine", agent_type=Tree)),
+            "Burning": (self.status_counts["Burning"], self.count_type(self, "Burning", agent_type=Tree)),
+            "Burned": (self.status_counts["Burned"], self.count_type(self, "Burned", agent_type=Tree)),
+            "Terra": (self.ground.bare_cells, sum(not any(isinstance(agent, (Tree, Obstacle)) for agent in cell) for cell in self.grid)),
+            "Total": (self.agent_counts[Tree], self.count_type(self, agent_type=Tree)),
+            "Clouds": (self.agent_counts[Cloud], self.count_type(self, agent_type=Cloud)),
+            "Frontier": (len(self.burning), self.count_type(self, "Burning", agent_type=Tree)),
+            "Burning cells": (int(self.burning_cells.sum()), len(self.burning)),
+            "Cloud cells": (sum(len(clouds) for _, clouds in self.cells.occupied_cells(AIR)), self.agent_counts[Cloud]),
+            "Vegetation layer": (sum(self.cells.vegetation(pos) is not None for _, pos in self.grid.coord_iter()), self.agent_counts[Tree]),
+        }
+        for name, (counter, scanned) in expected.items():
+            if counter != scanned:
+                raise AssertionError(f"Contador {name} = {counter}, mas a contagem completa deu {scanned}")
+
+        # Clusters: rotulados do zero a partir das células que já queimaram, das em chamas e das
+        # queimadas no incêndio atual
+        moore = np.ones((3, 3))
+        labels, n_clusters = ndimage.label(self.clusters.burned_mask(), structure=moore)
+        sizes = np.bincount(labels.ravel())[1:]
+        _, n_fronts = ndimage.label(self.burning_cells.reshape(self.width, self.height) > 0, structure=moore)
+        fire_labels, _ = ndimage.label(self.clusters.fire_mask(), structure=moore)
+        spanning = bool(set(fire_labels[0]) & set(fire_labels[-1]) - {0}
+                        or set(fire_labels[:, 0]) & set(fire_labels[:, -1]) - {0})
+        expected = {
+            "Burn clusters": (self.clusters.clusters, n_clusters),
+            "Largest burned patch": (self.clusters.largest, int(sizes.max()) if n_clusters else 0),
+            "Fire fronts": (self.clusters.fronts, n_fronts),
+            "Burning cells (clusters)": (sorted(self.clusters.burning_cells), np.flatnonzero(self.burning_cells).tolist()),
+            "Spanning": (self.clusters.spanning, spanning),
+        }
+        for name, (counter, scanned) in expected.items():
+            if counter != scanned:
+                raise AssertionError(f"Contador {name} = {counter}, mas a contagem completa deu {scanned}")
+
+        counter = self.CO2_balance()
+        scanned = self.count_CO2(self)
+        if counter != scanned:
+            raise AssertionError(f"Contador CO2(Kg) = {counter}, mas a contagem completa deu {scanned}")
+
     @staticmethod
     def count_type(model, status=None, agent_type=None):
         """
@@ -365,10 +540,8 @@ class ForestFire(mesa.Model):
    
     @staticmethod
     def count_CO2(model):
-        CO2_emission_total = 0
-        for agent in model.schedule.agents:
-            if isinstance(agent, Tree):
-                tree = agent
-                CO2_emission_total += tree.CO2_emission * model.biome.CO2_emission_factor
-                CO2_emission_total -= tree.CO2_sequestered * model.biome.CO2_emission_factor
-        return CO2_emission_total
\ No newline at end of file
+        # Somas exatas (math.fsum), como os totais mantidos pelo modelo
+        trees = [agent for agent in model.schedule.agents if isinstance(agent, Tree)]
+        CO2_emission_total = math.fsum(tree.CO2_emission for tree in trees)
+        CO2_sequestered_total = math.fsum(tree.CO2_sequestered for tree in trees)
+        return (CO2_emission_total - CO2_sequestered_total) * model.biome.CO2_emission_factor
\ No newline at end of file
@@ -0,0 +1,77 @@
+from functools import lru_cache
+import numpy as np
+
+# Vizinhanças usadas na reprodução das árvores
+FIRST_LEVEL_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+SECOND_LEVEL_DIRECTIONS = [(-2, 0), (2, 0), (0, -2), (0, 2), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+REPRODUCTION_DIRECTIONS = FIRST_LEVEL_DIRECTIONS + SECOND_LEVEL_DIRECTIONS
+
+
+class NeighbourhoodIndex:
+    '''
+    Índice pré-calculado das vizinhanças de reprodução de cada célula, já sem as posições fora do grid.
+
+    Só as células a menos de 2 células da borda têm vizinhanças diferentes do interior, então as
+    vizinhanças são guardadas por "classe de borda" (quais deslocamentos em x e em y cabem no grid),
+    e não por célula. Os índices planos seguem a ordem de um array (width, height): x * height + y.
+    '''
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+        def axis_ids(size):
+            # Para cada coordenada, o identificador do conjunto de deslocamentos de -2 a 2 que cabem no grid
+            keys = [frozenset(d for d in range(-2, 3) if 0 <= i + d < size) for i in range(size)]
+            ids = {key: n for n, key in enumerate(dict.fromkeys(keys))}
+            return [ids[key] for key in keys], list(ids)
+
+        self._x_ids, x_keys = axis_ids(width)
+        self._y_ids, y_keys = axis_ids(height)
+
+        self._levels = {}
+        for i, x_valid in enumerate(x_keys):
+            for j, y_valid in enumerate(y_keys):
+                first = [(dx, dy) for dx, dy in FIRST_LEVEL_DIRECTIONS if dx in x_valid and dy in y_valid]
+                second = [(dx, dy) for dx, dy in SECOND_LEVEL_DIRECTIONS if dx in x_valid and dy in y_valid]
+                self._levels[i, j] = (
+                    first, second,
+                    np.array([dx * height + dy for dx, dy in first], dtype=np.intp),
+                    np.array([dx * height + dy for dx, dy in second], dtype=np.intp),
+                )
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def for_shape(width: int, height: int):
+        '''Retorna o índice do formato de grid, construindo-o só na primeira vez.'''
+        return NeighbourhoodIndex(width, height)
+
+    def levels(self, pos):
+        '''
+        Returns:
+            - first_level (list): Posições vizinhas de primeiro nível dentro do grid
+            - second_level (list): Posições vizinhas de segundo nível dentro do grid
+        '''
+        x, y = pos
+        first, second, _, _ = self._levels[self._x_ids[x], self._y_ids[y]]
+        return [(x + dx, y + dy) for dx, dy in first], [(x + dx, y + dy) for dx, dy in second]
+
+    def count(self, pos, occupancy):
+        '''
+        Conta, nas vizinhanças de `pos`, as células dentro do grid e as células ocupadas.
+
+        Params:
+            - pos (tuple)
+                Posição da célula
+            - occupancy (np.ndarray)
+                Array plano (width * height) com o número de ocupantes de cada célula
+
+        Returns:
+            - (n_first_level_neighbors, n_second_level_neighbors, n_first_level_occupied, n_second_level_occupied)
+        '''
+        x, y = pos
+        _, _, first, second = self._levels[self._x_ids[x], self._y_ids[y]]
+        flat = x * self.height + y
+        return (len(first), len(second),
+                int(np.count_nonzero(occupancy[flat + first])),
+                int(np.count_nonzero(occupancy[flat + second])))
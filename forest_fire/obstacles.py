@@ -1,16 +1,22 @@
-from mesa import Agent
+from forest_fire.agent import CellAgent
+from forest_fire.layers import OBSTACLE
+
+class Obstacle(CellAgent): # Create a general obstacle
+    __slots__ = ()
+    layer = OBSTACLE
+    status = "Obstacle"
+    burnable = False
 
-class Obstacle(Agent): # Create a general obstacle
     def __init__(self, unique_id, model, pos):
         super().__init__(unique_id, model)
-        self.burnable = False
         self.pos = pos
-        self.status = "Obstacle"
         
 class Puddle(Obstacle):
+    __slots__ = ("status",)
+    burnable = True
+
     def __init__(self, unique_id, model, pos):
-        super().__init__(unique_id, model)
-        self.burnable = True
+        super().__init__(unique_id, model, pos)
         self.status = "Wet"
         
     def step(self):
@@ -21,20 +27,19 @@ class Puddle(Obstacle):
             self.status = "Evaporated"
             
 class Lake(Obstacle):
-    def __init__(self, unique_id, model, pos):
-        super().__init__(unique_id, model, pos)
-        self.burnable = False
-        self.status = "Lake"
+    __slots__ = ()
+    status = "Lake"
 
 class Corridor(Obstacle):
+    __slots__ = ("status", "radius")
+    burnable = True
+    spread_rate = 2.0
+
     def __init__(self, unique_id, model, pos, radius=1):
         super().__init__(unique_id, model, pos)
-        self.burnable = True
-        self.spread_rate = 2.0
         self.status = "Corridor"
         self.radius = radius
         
     def step(self):
         if self.status == "Burned":
-            self.model.grid.remove_agent(self)
-            self.model.schedule.remove(self)
\ No newline at end of file
+            self.model.remove_agent(self)
\ No newline at end of file
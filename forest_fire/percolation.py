@@ -0,0 +1,329 @@
+'''
+Limiar de percolação: a densidade de árvores a partir da qual o fogo atravessa o grid.
+
+Para cada bioma, procura por bissecção a densidade `tree_density` em que metade das execuções
+percola, isto é, em que o fogo aceso numa borda forma uma área queimada contínua até a borda oposta.
+Em cada densidade avaliada, as réplicas (sementes diferentes) rodam em paralelo, em lotes, até que o
+intervalo de confiança da fração que percolou exclua 1/2 ou se chegue a `max_replicas`. Cada réplica
+para assim que percolou ou que o fogo acabou, sem rodar todos os passos.
+
+As réplicas usam as mesmas sementes em todas as densidades de um bioma, o que reduz a variação entre
+as densidades comparadas. O limiar e o seu intervalo de confiança vêm de uma regressão logística da
+percolação pela densidade com todas as réplicas, com bootstrap.
+
+Uso:
+    python -m forest_fire.percolation --biomes Cerrado Caatinga --size 100 --wind 0.5 --processes 4
+'''
+
+import argparse
+import json
+import math
+from multiprocessing import Pool
+
+import numpy as np
+from scipy import ndimage
+
+from forest_fire.biome import biomes
+from forest_fire.landscape import BURNING
+from forest_fire.seeds import child_seeds
+
+# Parâmetros fixos das réplicas: fogo aceso numa borda, sem replantio, nuvens nem bombeiros
+BASE_PARAMETERS = {
+    "random_fire": False,
+    "position_fire": "Top",
+    "reprod_speed": 0,
+    "rainy_season": False,
+    "cloud_quantity": 0,
+    "fireman_quantity": 0,
+}
+
+# Borda onde o fogo começa e borda oposta, como (eixo, índice); -1 é a última linha ou coluna
+EDGES = {
+    "Top": ((1, -1), (1, 0)),
+    "Bottom": ((1, 0), (1, -1)),
+    "Left": ((0, 0), (0, -1)),
+    "Right": ((0, -1), (0, 0)),
+}
+
+Z_95 = 1.959964
+
+
+def burning_mask(model):
+    '''Células com árvores em chamas, no formato (width, height), nos dois motores.'''
+    if hasattr(model, "burning_cells"):
+        return model.burning_cells.reshape(model.width, model.height) > 0
+    return model.status == BURNING
+
+
+def spans(burned, position_fire: str):
+    '''
+    Se alguma área queimada contínua (vizinhança de Moore) liga a borda onde o fogo começou à
+    borda oposta; com o fogo no meio ("Middle"), se ela chega a qualquer borda.
+    '''
+    labels, _ = ndimage.label(burned, structure=np.ones((3, 3)))
+    if position_fire == "Middle":
+        border = np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+        center = labels[labels.shape[0] // 2, labels.shape[1] // 2]
+        return center != 0 and center in border
+    (start_axis, start), (end_axis, end) = EDGES[position_fire]
+    start_labels = np.take(labels, start, axis=start_axis)
+    end_labels = np.take(labels, end, axis=end_axis)
+    return bool(np.intersect1d(start_labels[start_labels != 0], end_labels[end_labels != 0]).size)
+
+
+def run_replica(engine: str, kwargs: dict, max_steps: int):
+    '''
+    Roda uma réplica até ela percolar, o fogo acabar ou `max_steps` passos.
+
+    Returns:
+        - percolated (bool)
+        - steps (int): Passos simulados
+    '''
+    from forest_fire.engines import ENGINES
+
+    model = ENGINES[engine](**kwargs)
+    model.collect_every = 0  # Os dados do `datacollector` não são usados aqui
+    position_fire = kwargs.get("position_fire", BASE_PARAMETERS["position_fire"])
+    burned = burning_mask(model).copy()
+    for _ in range(max_steps):
+        if spans(burned, position_fire):
+            return True, model.schedule.steps
+        if model.fire_extinguished():
+            return False, model.schedule.steps
+        model.step()
+        burned |= burning_mask(model)
+    return spans(burned, position_fire), model.schedule.steps
+
+
+def _run(task):
+    density, replica, engine, kwargs, max_steps = task
+    return density, replica, *run_replica(engine, kwargs, max_steps)
+
+
+def wilson_interval(successes: int, n: int, z: float = Z_95):
+    '''Intervalo de confiança de Wilson de uma proporção.'''
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    center = (p + z**2 / (2 * n)) / (1 + z**2 / n)
+    half = z * math.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / (1 + z**2 / n)
+    return center - half, center + half
+
+
+def logistic_threshold(densities, outcomes, ridge: float = 1e-3):
+    '''
+    Densidade em que a probabilidade de percolar é 1/2, pela regressão logística de `outcomes`
+    (0 ou 1) por `densities`. A penalização `ridge` evita coeficientes infinitos quando as
+    réplicas estão perfeitamente separadas.
+
+    Returns:
+        - threshold (float | None): None se a percolação não cresce com a densidade
+    '''
+    x = np.asarray(densities, dtype=float)
+    y = np.asarray(outcomes, dtype=float)
+    mean = x.mean()
+    X = np.column_stack([np.ones_like(x), x - mean])
+    beta = np.zeros(2)
+    for _ in range(50):  # Newton (IRLS)
+        p = 1 / (1 + np.exp(-np.clip(X @ beta, -30, 30)))
+        gradient = X.T @ (y - p) - ridge * np.array([0, beta[1]])
+        hessian = X.T @ (X * (p * (1 - p))[:, None]) + ridge * np.diag([0, 1]) + 1e-9 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        beta += step
+        if np.abs(step).max() < 1e-8:
+            break
+    if beta[1] <= 0:
+        return None
+    return mean - beta[0] / beta[1]
+
+
+def threshold_interval(densities, outcomes, n_bootstrap: int = 200, seed: int = 0, z: float = Z_95):
+    '''
+    Limiar e intervalo de confiança (percentis do bootstrap, reamostrando as réplicas de cada densidade).
+
+    Returns:
+        - threshold, low, high (float | None)
+    '''
+    densities = np.asarray(densities, dtype=float)
+    outcomes = np.asarray(outcomes, dtype=float)
+    threshold = logistic_threshold(densities, outcomes)
+    rng = np.random.default_rng(seed)
+    groups = [np.flatnonzero(densities == d) for d in np.unique(densities)]
+    estimates = []
+    for _ in range(n_bootstrap):
+        sample = np.concatenate([rng.choice(group, len(group)) for group in groups])
+        estimate = logistic_threshold(densities[sample], outcomes[sample])
+        if estimate is not None:
+            estimates.append(estimate)
+    if not estimates:
+        return threshold, None, None
+    alpha = 1 - math.erf(z / math.sqrt(2))
+    low, high = np.quantile(estimates, [alpha / 2, 1 - alpha / 2])
+    return threshold, float(low), float(high)
+
+
+class PercolationExplorer:
+    '''
+    Procura o limiar de percolação de cada bioma.
+
+    Params:
+        - engine ("agents" | "array")
+            Motor de simulação (ver engines.py)
+        - parameters (dict)
+            Parâmetros do modelo, somados a `BASE_PARAMETERS` (por exemplo tamanho e vento)
+        - seed (int)
+            Semente base das réplicas
+        - max_steps (int | None)
+            Passos máximos de cada réplica (None: 3 vezes o lado do grid)
+        - batch (int)
+            Réplicas rodadas de uma vez em cada densidade
+        - max_replicas (int)
+            Réplicas máximas em cada densidade
+        - tolerance (float)
+            Largura do intervalo de densidades em que a bissecção para
+        - processes (int | None)
+            Número de processos (None: todos os processadores; 1: sem pool)
+    '''
+
+    def __init__(self, engine: str = "agents", parameters: dict = None, seed: int = 42, max_steps: int = None,
+                 batch: int = 8, max_replicas: int = 32, tolerance: float = 0.02, processes=None):
+        self.engine = engine
+        self.parameters = {**BASE_PARAMETERS, **(parameters or {})}
+        self.seed = seed
+        size = max(self.parameters.get("width", 100), self.parameters.get("height", 100))
+        self.max_steps = max_steps if max_steps is not None else 3 * size
+        self.batch = batch
+        self.max_replicas = max_replicas
+        self.tolerance = tolerance
+        self.processes = processes
+        self._pool = None
+
+    def _map(self, tasks):
+        if self.processes == 1:
+            return map(_run, tasks)
+        if self._pool is None:
+            self._pool = Pool(self.processes)
+        return self._pool.imap_unordered(_run, tasks)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def evaluate(self, biome_name: str, density: float, seeds):
+        '''
+        Roda réplicas numa densidade, em lotes, até o intervalo de confiança excluir 1/2.
+
+        Returns:
+            - evaluation (dict): densidade, réplicas, quantas percolaram, intervalo e passos simulados
+        '''
+        outcomes, steps = [], 0
+        while len(outcomes) < self.max_replicas:
+            start = len(outcomes)
+            tasks = [(density, replica, self.engine,
+                      {**self.parameters, "biome_name": biome_name, "tree_density": density, "seed": seeds[replica]},
+                      self.max_steps)
+                     for replica in range(start, min(start + self.batch, self.max_replicas))]
+            for _, _, percolated, replica_steps in self._map(tasks):
+                outcomes.append(percolated)
+                steps += replica_steps
+            low, high = wilson_interval(sum(outcomes), len(outcomes))
+            if high < 0.5 or low > 0.5:
+                break
+        return {"density": density, "replicas": len(outcomes), "percolated": int(sum(outcomes)),
+                "low": low, "high": high, "steps": steps, "outcomes": outcomes}
+
+    def explore(self, biome_name: str, low: float = 0.01, high: float = 1.0):
+        '''
+        Bissecção da densidade em [low, high] para um bioma.
+
+        Returns:
+            - result (dict): limiar, intervalo de confiança, densidades avaliadas e passos simulados
+        '''
+        seeds = child_seeds([self.seed, list(biomes).index(biome_name)], self.max_replicas)
+        evaluations = []
+        while high - low > self.tolerance:
+            middle = (low + high) / 2
+            evaluation = self.evaluate(biome_name, middle, seeds)
+            evaluations.append(evaluation)
+            if evaluation["percolated"] / evaluation["replicas"] >= 0.5:
+                high = middle
+            else:
+                low = middle
+
+        densities = [e["density"] for e in evaluations for _ in e["outcomes"]]
+        outcomes = [int(o) for e in evaluations for o in e["outcomes"]]
+        threshold, ci_low, ci_high = threshold_interval(densities, outcomes, seed=self.seed) \
+            if evaluations else (None, None, None)
+        return {
+            "biome_name": biome_name,
+            "threshold": threshold if threshold is not None else (low + high) / 2,
+            "ci_low": ci_low,
+            "ci_high": ci_high,
+            "bracket": [low, high],
+            "evaluations": [{k: v for k, v in e.items() if k != "outcomes"} for e in evaluations],
+            "replicas": len(outcomes),
+            "steps": sum(e["steps"] for e in evaluations),
+        }
+
+    def explore_biomes(self, biome_names=None, verbose: bool = True):
+        '''
+        Limiar de cada bioma (por padrão, todos de `biomes`).
+
+        Returns:
+            - results (list[dict])
+        '''
+        results = []
+        try:
+            for biome_name in biome_names or list(biomes):
+                result = self.explore(biome_name)
+                results.append(result)
+                if verbose:
+                    print(format_result(result))
+        finally:
+            self.close()
+        return results
+
+
+def format_result(result: dict):
+    interval = "" if result["ci_low"] is None else f" (IC 95%: {result['ci_low']:.3f} a {result['ci_high']:.3f})"
+    return (f"{result['biome_name']:<15} limiar {result['threshold']:.3f}{interval}"
+            f"  {result['replicas']} réplicas, {result['steps']} passos")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Limiar de percolação do ForestFire por bioma.")
+    parser.add_argument("--biomes", nargs="+", default=list(biomes), choices=list(biomes))
+    parser.add_argument("--engine", default="agents", choices=["agents", "array"])
+    parser.add_argument("--size", type=int, default=100)
+    parser.add_argument("--wind", type=float, default=0, help="Intensidade do vento")
+    parser.add_argument("--wind-direction", default="N", choices=["N", "S", "E", "W"])
+    parser.add_argument("--position-fire", default="Top", choices=["Top", "Bottom", "Left", "Right", "Middle"])
+    parser.add_argument("--params", help="Arquivo JSON com outros parâmetros do modelo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--max-replicas", type=int, default=32)
+    parser.add_argument("--tolerance", type=float, default=0.02)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--output", help="Arquivo JSON onde os resultados são gravados")
+    args = parser.parse_args(argv)
+
+    parameters = {}
+    if args.params:
+        with open(args.params) as f:
+            parameters.update(json.load(f))
+    parameters.update({"width": args.size, "height": args.size, "wind_intensity": args.wind,
+                       "wind_direction": args.wind_direction, "position_fire": args.position_fire})
+
+    explorer = PercolationExplorer(args.engine, parameters, args.seed, args.max_steps, args.batch,
+                                   args.max_replicas, args.tolerance, args.processes)
+    results = explorer.explore_biomes(args.biomes)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+'''
+Medição do tempo de cada fase do passo do modelo, sem profiler externo.
+
+O modelo criado com `profile=True` mede o tempo e o número de chamadas de cada fase a cada passo e
+grava uma linha por fase na tabela "Phases" do `datacollector`:
+    model.datacollector.get_table_dataframe("Phases")
+
+Desligado, o custo é o de um `with` que não faz nada por fase.
+'''
+
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+PHASES_TABLE = "Phases"
+PHASES_COLUMNS = ["Step", "Phase", "Seconds", "Calls"]
+
+_NO_PHASE = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+class StepProfiler:
+    '''
+    Acumula, durante um passo, o tempo (em segundos) e o número de chamadas de cada fase.
+
+    Params:
+        - enabled (bool)
+            Se falso, `phase` não mede nada e `add` não deve ser chamado
+    '''
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.last = {}  # Tempos do último passo terminado, por fase
+
+    def phase(self, name: str):
+        '''Contexto que mede uma chamada da fase `name`.'''
+        return _Phase(self, name) if self.enabled else _NO_PHASE
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        self.seconds[name] += seconds
+        self.calls[name] += calls
+
+    def end_step(self, datacollector, step: int):
+        '''Grava as fases do passo na tabela do `datacollector` e recomeça a contagem.'''
+        if not self.enabled:
+            return
+        for name, seconds in self.seconds.items():
+            datacollector.add_table_row(PHASES_TABLE, {"Step": step, "Phase": name,
+                                                       "Seconds": seconds, "Calls": self.calls[name]})
+        self.last = dict(self.seconds)
+        self.seconds.clear()
+        self.calls.clear()
@@ -0,0 +1,100 @@
+import heapq
+import time
+import mesa
+from mesa.agent import AgentSet
+
+class FrontierActivation(mesa.time.RandomActivation):
+    """
+    Agendador que, a cada passo, ativa em ordem aleatória só os agentes da fronteira: os que podem
+    mudar algo no passo (árvores em chamas, árvores que ainda se reproduzem, nuvens, bombeiros...).
+
+    Todo agente entra na fronteira ao ser adicionado. Depois de ativado, ele só continua nela se o
+    seu atributo `active` for verdadeiro; os demais voltam quando alguém chama `activate`.
+
+    A ordem é a mesma que o `RandomActivation` daria com todos os agentes: cada agente da fronteira
+    recebe uma posição uniforme em [0, 1) e eles são ativados em ordem crescente. Um agente ativado
+    no meio do passo (por exemplo, uma árvore que pegou fogo) recebe a sua posição nessa hora: se
+    ela vem depois da do agente atual, ele ainda é ativado neste passo, como seria se estivesse na
+    fila desde o início; senão, fica para o próximo.
+    """
+    def __init__(self, model, agents=None):
+        super().__init__(model, agents)
+        self.frontier = {} # Dicionário usado como conjunto ordenado, para manter a reprodutibilidade
+        # Estado do passo em andamento (None entre os passos): fila (posição, ordem, agente),
+        # agentes na fila, agentes já ativados e a posição do agente atual
+        self._queue = None
+        self._queued = set()
+        self._done = set()
+        self._rank = 0.0
+        self._pushed = 0
+
+    def __getstate__(self):
+        """Estado para o checkpoint: o `AgentSet` guarda referências fracas, então vira uma lista."""
+        state = self.__dict__.copy()
+        state["_agents"] = list(self._agents)
+        del state["step"], state["_original_step"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._agents = AgentSet(state["_agents"], self.model)
+        self._original_step = self.step
+        self.step = self._wrapped_step
+
+    def add(self, agent):
+        super().add(agent)
+        self.activate(agent)
+
+    def remove(self, agent):
+        super().remove(agent)
+        self.frontier.pop(agent, None)
+        self._queued.discard(agent)
+
+    def activate(self, agent):
+        """
+        Coloca o agente na fronteira. No meio de um passo, se o agente ainda não foi ativado nele,
+        sorteia a sua posição e o ativa ainda neste passo caso ela venha depois da do agente atual.
+        """
+        if self._queue is None or agent in self._done or agent in self.frontier:
+            self.frontier[agent] = None
+        elif agent not in self._queued:
+            rank = self.model.random.random()
+            if rank > self._rank:
+                self._push(rank, agent)
+            else:
+                self.frontier[agent] = None
+
+    def _push(self, rank, agent):
+        heapq.heappush(self._queue, (rank, self._pushed, agent))
+        self._queued.add(agent)
+        self._pushed += 1
+
+    def step(self):
+        """Ativa os agentes da fronteira, um de cada vez, em ordem aleatória."""
+        agents = list(self.frontier)
+        self.frontier = {}
+        self._queue, self._pushed = [], 0
+        for agent in agents:
+            self._push(self.model.random.random(), agent)
+        profiler = getattr(self.model, "profiler", None)
+        timed = profiler is not None and profiler.enabled
+        while self._queue:
+            self._rank, _, agent = heapq.heappop(self._queue)
+            self._queued.discard(agent)
+            # Agentes removidos do grid durante o passo não são ativados
+            if agent.pos is None:
+                continue
+            self._done.add(agent)
+            if timed:
+                start = time.perf_counter()
+                agent.step()
+                profiler.add(f"schedule.{type(agent).__name__}", time.perf_counter() - start)
+            else:
+                agent.step()
+            if agent.pos is not None and getattr(agent, "active", False):
+                self.activate(agent)
+        self._queue = None
+        self._done.clear()
+        self._rank = 0.0
+        self.steps += 1
+        self.time += 1
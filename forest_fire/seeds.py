@@ -0,0 +1,35 @@
+'''
+Sementes dos sorteios. Cada modelo tem um único fluxo de números aleatórios, definido pela sua
+semente: o `random` do mesa e um gerador do NumPy (`rng`) derivado dele.
+'''
+
+import numpy as np
+
+
+def seed_random(model, seed=None):
+    '''
+    Semeia os geradores do modelo.
+
+    Sem semente, sorteia uma nova a partir da entropia do sistema operacional, e não do `random`
+    global, que é compartilhado pelos processos criados com fork no `batch_run`.
+    A semente usada fica em `model._seed`, para reproduzir a simulação.
+    '''
+    if seed is None:
+        seed = _to_seed(np.random.SeedSequence())
+    model.reset_randomizer(seed)
+    model.rng = np.random.default_rng(model.random.getrandbits(64))
+
+
+def child_seeds(seed, n: int):
+    '''
+    Gera `n` sementes independentes a partir de uma semente base, uma para cada execução de um lote.
+
+    Returns:
+        - seeds (list[int])
+    '''
+    return [_to_seed(child) for child in np.random.SeedSequence(seed).spawn(n)]
+
+
+def _to_seed(seed_sequence):
+    # Semente inteira de 63 bits, que cabe numa coluna int64
+    return int(seed_sequence.generate_state(1, np.uint64)[0]) % 2**63
@@ -1,13 +1,17 @@
 import mesa
-from forest_fire.model import ForestFire
-from forest_fire.tree import Tree, Terra
-from forest_fire.obstacles import Obstacle, Corridor, Puddle, Lake
-from forest_fire.cloud import Cloud
-from forest_fire.fireman import Fireman
+from forest_fire.engines import ENGINES
+from forest_fire.frames import RasterGrid
 
-# Ajuste do tamanho do grid e da tela
-GRID_WIDTH = 20
-GRID_HEIGHT = 20
+# Motor de simulação: "agents" ou "array" (ver engines.py)
+ENGINE = "agents"
+
+# Mostra um gráfico com o tempo de cada fase do passo (ver profiling.py)
+PROFILE = False
+
+# Ajuste do tamanho inicial do grid (até MAX_GRID_SIZE, escolhido na interface) e da tela
+GRID_WIDTH = 100
+GRID_HEIGHT = 100
+MAX_GRID_SIZE = 200
 CANVAS_WIDTH = 750
 CANVAS_HEIGHT = 750
 
@@ -25,112 +29,8 @@ COLORS = {
     "Fireman": "#00A8FF" 
 }
 
-def agent_portrayal(agent):
-    """
-    Função que determina como um agente (árvore ou terra) será representado no grid.
-
-    :param agent: O agente a ser desenhado (pode ser uma árvore ou terra)
-    :return: Um dicionário com as propriedades para renderização do agente
-    """
-    # Verifica se o agente é 'None' (caso o grid tenha uma célula vazia)
-    if not agent:
-        return 
-
-    x, y = agent.pos
-    
-    if isinstance(agent, Obstacle) or isinstance(agent, Corridor) or isinstance(agent, Puddle) or isinstance(agent, Lake):
-        shape = f"forest_fire/static/images/obstacles/{agent.status}.png" if agent.model.biome.code != 'default' else 'rect'
-        return {
-            "Shape": shape,
-            "w": 1,
-            "h": 1,
-            "Filled": True,
-            "Layer": 10,
-            "x": x,
-            "y": y,
-            "Color": COLORS[agent.status],
-        }
-
-    if isinstance(agent, Terra):
-        # A cor e a imagem da Terra já são gerenciadas pela classe Terra
-        # A função update_color() é chamada no método step() de Terra
-        # Se a Terra tem uma imagem associada, usa a imagem
-        
-        # Obtém as árvores na célula atual
-        trees_in_cell = agent.model.get_cell_items([agent.pos], [Tree])
-        tree = None if len(trees_in_cell) == 0 else trees_in_cell[0]
-        
-        obstacles_in_cell = agent.model.get_cell_items([agent.pos], [Obstacle, Corridor, Puddle, Lake])
-        
-        shape = 'rect'
-        color = agent.color if agent.color else COLORS["Terra"]
-        if tree:
-            if tree.status == 'Fine':
-                color = tree.color if tree.color else COLORS["Fine"]
-            else:
-                color = COLORS[tree.status]
-        elif len(obstacles_in_cell) != 0:
-            obstacle = obstacles_in_cell[0]
-            color = COLORS[obstacle.status] 
-        elif agent.img_path:
-            shape = agent.get_image()
-        
-        return {
-            "x": x,
-            "y": y,
-            "w": 1,
-            "h": 1,
-            "Layer": 0,
-            "Filled": True,
-            "Shape": shape,  # Forma da Terra (imagem ou retângulo)
-            "Color": color,  # Cor da Terra
-        }
-
-    if isinstance(agent, Tree):
-        image = agent.get_image()  # Obtém o caminho da imagem da árvore
-        color = agent.color if agent.color else COLORS["Fine"]
-        if agent.status != "Fine":
-            color = COLORS[agent.status]
-                
-        return {
-            "x" : x,
-            "y" : y,
-            "w" : 1,
-            "h" : 1,
-            "Layer" : 1,
-            "Filled": True,
-            "Shape": image if image else 'rect',
-            "Color": color
-        }
-
-    if isinstance(agent, Cloud):
-            return {
-                "Shape": "circle",
-                "r": agent.size,  
-                "Filled": True,
-                "Layer": 20,
-                "x": x,
-                "y": y,
-                "Color": COLORS["heavy cloud"] if agent.full else COLORS["Cloud"], 
-            }
-    
-    if isinstance(agent, Fireman):
-        return {
-            "Shape": "circle",
-            "r": 0.5,                     
-            "Filled": True,         
-            "Layer": 1,
-            "x": x,
-            "y": y,  
-            "Color":COLORS["Fireman"],                                 
-        }
-
-canvas_element = mesa.visualization.CanvasGrid(lambda agent: agent_portrayal(agent), GRID_WIDTH, GRID_HEIGHT, CANVAS_WIDTH, CANVAS_HEIGHT)
-
-canvas_element = mesa.visualization.CanvasGrid(
-    lambda agent: agent_portrayal(agent),
-    GRID_WIDTH, GRID_HEIGHT, CANVAS_WIDTH, CANVAS_HEIGHT
-)
+# O grid é desenhado como um raster, com só as células alteradas mandadas a cada passo (ver frames.py)
+canvas_element = RasterGrid(COLORS, CANVAS_WIDTH, CANVAS_HEIGHT)
 # TODO adicionar o numero de nuvens e um novo grafico para arvores apagadas
 
 # Criando o gráfico de CO2 separadamente
@@ -146,11 +46,41 @@ pie_chart = mesa.visualization.PieChartModule(
     [{"Label": label, "Color": color} for (label, color) in COLORS.items() if label in ["Fine", "Burning", "Burned"]]
 )
 
+class PhaseChart(mesa.visualization.ChartModule):
+    """
+    Gráfico do tempo (em ms) de cada fase no último passo, lido do `profiler` do modelo.
+    Tem as fases medidas pelos dois motores (uma fase que um motor não mede fica em 0); "schedule.step"
+    fica de fora, pois é a soma das fases "schedule.<classe>" de cada tipo de agente.
+    """
+    PHASE_COLORS = {
+        "propagate_fire": "#cf0f0f",
+        "spread_fire": "#ff8c00",
+        "dispatch": "#0050a0",
+        "reproduce": "#148c39",
+        "schedule.Tree": "#67B921",
+        "schedule.Corridor": "#8FBF3C",
+        "schedule.Lake": "#3A77F0",
+        "schedule.Obstacle": "#6E6E6E",
+        "schedule.Cloud": "#A0A0A0",
+        "schedule.Fireman": "#00A8FF",
+        "regrowth": "#6B4423",
+        "clusters": "#8e44ad",
+        "datacollector": "#000000",
+        "clouds": "#565b70",
+        "random_fire": "#cccc00",
+    }
+
+    def __init__(self):
+        super().__init__([{"Label": phase, "Color": color} for phase, color in self.PHASE_COLORS.items()])
+
+    def render(self, model):
+        return [model.profiler.last.get(phase, 0) * 1000 for phase in self.PHASE_COLORS]
+
 model_params = {
     "rainy_season": mesa.visualization.Checkbox("Estação chuvosa", False),
     "biome_name": mesa.visualization.Choice("Biome", "Default", ["Default","Amazônia","Caatinga","Cerrado","Pantanal","Mata Atlântica"]), 
-    "width": GRID_WIDTH,
-    "height": GRID_HEIGHT,
+    "width": mesa.visualization.Slider("Grid Width", GRID_WIDTH, 10, MAX_GRID_SIZE, 10),
+    "height": mesa.visualization.Slider("Grid Height", GRID_HEIGHT, 10, MAX_GRID_SIZE, 10),
     "random_fire" : mesa.visualization.Checkbox("Random Fire Start", True),
     "position_fire": mesa.visualization.Choice("Fire Start Direction","Top", ["Top", "Bottom", "Left", "Right", "Middle"]),
     "tree_density": mesa.visualization.Slider("Tree Density", 0, 0, 1.0, 0.01, description="If the value is 0, the biome density will be used."),
@@ -169,8 +99,14 @@ model_params = {
     "individual_lakes": mesa.visualization.Checkbox("Individual Lakes", True),
     "wind_direction": mesa.visualization.Choice("Wind Direction", "N", ["N", "S", "E", "W"]),
     "wind_intensity": mesa.visualization.Slider("Wind Intensity", 0, 0.0, 1.0, 0.1),
+    "weighted_ignition": mesa.visualization.Checkbox("Weighted Random Fires", False),
+    "profile": PROFILE,
 }
 
+visualization_elements = [canvas_element, tree_chart, pie_chart, co2_chart]
+if PROFILE:
+    visualization_elements.append(PhaseChart())
+
 server = mesa.visualization.ModularServer(
-    ForestFire, [canvas_element, tree_chart, pie_chart, co2_chart], "Forest Fire", model_params
+    ENGINES[ENGINE], visualization_elements, "Forest Fire", model_params
 )
\ No newline at end of file
@@ -0,0 +1,164 @@
+'''
+Núcleo vetorizado da propagação do fogo e da reprodução das árvores.
+
+As funções recebem arrays cujos dois últimos eixos são (x, y) e podem ter eixos extras na frente
+(por exemplo, réplicas). Os arrays de estado são alterados no lugar.
+'''
+
+import numpy as np
+from forest_fire.landscape import GROUND, LAKE, CORRIDOR, EMPTY, FINE, BURNING, BURNED
+from forest_fire.neighbourhood import FIRST_LEVEL_DIRECTIONS, SECOND_LEVEL_DIRECTIONS
+
+# Vizinhança de Moore (raio 1)
+MOORE = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+
+# CO2 emitido por unidade de tamanho da árvore: biomassa (20 x tamanho) x 0.5 x 3.67
+CO2_PER_SIZE = 20 * 0.5 * 3.67
+
+
+def shift(values, dx, dy):
+    '''
+    Desloca `values` de (dx, dy): o resultado em (x, y) é o valor de (x - dx, y - dy), ou 0 fora do grid.
+    '''
+    result = np.zeros_like(values)
+    width, height = values.shape[-2:]
+    src_x = slice(max(-dx, 0), width - max(dx, 0))
+    dst_x = slice(max(dx, 0), width - max(-dx, 0))
+    src_y = slice(max(-dy, 0), height - max(dy, 0))
+    dst_y = slice(max(dy, 0), height - max(-dy, 0))
+    result[..., dst_x, dst_y] = values[..., src_x, src_y]
+    return result
+
+
+def neighbor_sum(values, offsets):
+    '''
+    Soma, para cada célula, os valores das células deslocadas por `offsets` (fora do grid conta 0).
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    total = np.zeros_like(values)
+    for dx, dy in offsets:
+        total += shift(values, -dx, -dy)
+    return total
+
+
+def dilate(mask, radius=1):
+    '''
+    Marca as células a até `radius` células (distância de Chebyshev) de alguma célula de `mask`.
+    '''
+    result = mask.copy()
+    for d in range(1, radius + 1):
+        result |= shift(mask, d, 0) | shift(mask, -d, 0)
+    rows = result.copy()
+    for d in range(1, radius + 1):
+        result |= shift(rows, 0, d) | shift(rows, 0, -d)
+    return result
+
+
+def ignition_probability(threshold):
+    '''Probabilidade de `randint(0, 100) > threshold`, o sorteio usado em `ForestFire.propagate_fire`.'''
+    return float(np.clip(100 - np.floor(threshold), 0, 101)) / 101
+
+
+def wind_spread(status, size, CO2_emission, wind_vector, wind_intensity, rng):
+    '''
+    Propagação influenciada pelo vento: cada árvore em chamas tenta incendiar cada vizinha saudável,
+    com mais chance na direção do vento, e termina queimada.
+
+    Returns:
+        - ignited (np.ndarray): Máscara das árvores incendiadas neste passo
+    '''
+    burning = status == BURNING
+    if not burning.any():
+        return np.zeros_like(burning)
+
+    alpha = 70 + wind_intensity*25
+    beta = 35 - wind_intensity*15
+    p_wind, p_other = ignition_probability(beta), ignition_probability(alpha)
+
+    n_burning = neighbor_sum(burning, MOORE)
+    n_wind = shift(burning, *wind_vector).astype(np.float64) if wind_vector != (0, 0) else 0
+    miss = (1 - p_wind) ** n_wind * (1 - p_other) ** (n_burning - n_wind)
+    ignited = (status == FINE) & (n_burning > 0) & (rng.random(status.shape) >= miss)
+
+    CO2_emission[burning] = size[burning] * CO2_PER_SIZE
+    status[burning] = BURNED
+    status[ignited] = BURNING
+    return ignited
+
+
+def spread(status, terrain, size, CO2_emission, corridor_radius):
+    '''
+    Propagação de `Tree.step` para todas as árvores em chamas ao mesmo tempo:
+        - a árvore ao lado de um lago se apaga, sem emitir CO2;
+        - as demais incendeiam as árvores vizinhas saudáveis e queimam os corredores vizinhos,
+          que incendeiam as árvores a até `corridor_radius` células;
+        - e terminam queimadas, emitindo `size * 20 * 0.5 * 3.67` de CO2.
+
+    Returns:
+        - ignited (np.ndarray): Máscara das árvores incendiadas neste passo
+    '''
+    burning = status == BURNING
+    if not burning.any():
+        return np.zeros_like(burning)
+
+    near_lake = dilate(terrain == LAKE)
+    spreading = burning & ~near_lake
+    reach = dilate(spreading)
+
+    fine = status == FINE
+    ignited = fine & reach
+    corridors = (terrain == CORRIDOR) & reach
+    if corridors.any():
+        ignited |= fine & dilate(corridors, corridor_radius)
+        terrain[corridors] = GROUND
+
+    CO2_emission[spreading] = size[spreading] * CO2_PER_SIZE
+    status[burning] = BURNED
+    status[ignited] = BURNING
+    return ignited
+
+
+def reproduction_sources(status, n_first_level, n_second_level, tree_density):
+    '''
+    Árvores saudáveis abaixo da densidade esperada na sua vizinhança, que tentam crescer árvores
+    nas células vizinhas (ver `Tree.tree_reproduction`). `n_first_level` e `n_second_level` são
+    os números de vizinhos de cada nível dentro do grid.
+
+    Returns:
+        - t1, t2 (np.ndarray): Árvores saudáveis no primeiro e no segundo nível da vizinhança
+        - sources (np.ndarray): Máscara das árvores que se reproduzem
+    '''
+    fine = status == FINE
+    t1 = neighbor_sum(fine, FIRST_LEVEL_DIRECTIONS)
+    t2 = neighbor_sum(fine, SECOND_LEVEL_DIRECTIONS)
+    sources = fine & (t1 + t2 < tree_density * (n_first_level + n_second_level + 1))
+    return t1, t2, sources
+
+
+def regrowth(status, terrain, n_first_level, n_second_level, t1, t2, sources, tree_density, reprod_speed, uniform):
+    '''
+    Reprodução a partir das árvores de `sources`: cada uma tenta crescer árvores nas células vazias
+    ou queimadas da sua vizinhança, e as árvores queimadas visitadas que não rebrotam viram terra.
+    `uniform` é o sorteio uniforme de cada célula.
+
+    Returns:
+        - grow (np.ndarray): Máscara das células onde cresce uma árvore
+        - cleared (np.ndarray): Máscara das árvores queimadas que viram terra
+    '''
+    n1, n2 = n_first_level, n_second_level
+    neighbors_number = n1 + n2 + 1
+    expected_trees = neighbors_number * tree_density - (t1 + t2)
+    r1 = np.where(sources, expected_trees / (n1 * neighbors_number) * reprod_speed, 0)
+    r2 = np.where(sources, expected_trees / (n2 * neighbors_number) * reprod_speed, 0)
+
+    # Probabilidade de nenhuma árvore vizinha crescer uma árvore na célula
+    log_miss = (neighbor_sum(np.log1p(-np.clip(r1, 0, 1 - 1e-12)), FIRST_LEVEL_DIRECTIONS)
+                + neighbor_sum(np.log1p(-np.clip(r2, 0, 1 - 1e-12)), SECOND_LEVEL_DIRECTIONS))
+    visited = (neighbor_sum(sources, FIRST_LEVEL_DIRECTIONS) + neighbor_sum(sources, SECOND_LEVEL_DIRECTIONS)) > 0
+
+    burned = status == BURNED
+    growable = (((status == EMPTY) & (terrain == GROUND)) | burned) \
+        & (t1 < n1 * tree_density) & (t2 < n2 * tree_density)
+    grow = visited & growable & (uniform >= np.exp(log_miss))
+    cleared = visited & burned & ~grow
+    return grow, cleared
@@ -0,0 +1,111 @@
+// Desenha o grid mandado por `RasterGrid` (ver frames.py): um código da paleta por célula,
+// com o quadro completo ("full") ou só as células que mudaram ("delta"), mais nuvens e bombeiros.
+const RasterModule = function (canvas_width, canvas_height, overlay_colors) {
+  // Tamanho mínimo da célula, em pixels, para desenhar as imagens do bioma
+  const MIN_IMAGE_CELL = 8;
+
+  const canvas = document.createElement("canvas");
+  Object.assign(canvas, { width: canvas_width, height: canvas_height, className: "world-grid" });
+  const parent = document.createElement("div");
+  Object.assign(parent, { style: `height:${canvas_height}px;`, className: "world-grid-parent" });
+  parent.appendChild(canvas);
+  document.getElementById("elements").appendChild(parent);
+  const context = canvas.getContext("2d");
+
+  // Uma célula por pixel, ampliado para a tela
+  const raster = document.createElement("canvas");
+  const rasterContext = raster.getContext("2d");
+  let pixels = null;
+  let codes = null;
+  let colors = [];
+  let images = [];
+  let width = 0;
+  let height = 0;
+
+  const parseColor = (color) => {
+    rasterContext.fillStyle = color;
+    const hex = rasterContext.fillStyle; // O navegador normaliza a cor para #rrggbb
+    return [1, 3, 5].map((i) => parseInt(hex.slice(i, i + 2), 16));
+  };
+
+  const loadImage = (path) => {
+    if (!path) return null;
+    const image = new Image();
+    image.src = "local/custom/" + path;
+    return image;
+  };
+
+  // A célula (x, y) fica no índice x * height + y; o y cresce para cima, como no CanvasGrid
+  const paint = (cell) => {
+    const x = Math.floor(cell / height);
+    const y = cell % height;
+    const offset = ((height - 1 - y) * width + x) * 4;
+    const rgb = colors[codes[cell]];
+    pixels.data[offset] = rgb[0];
+    pixels.data[offset + 1] = rgb[1];
+    pixels.data[offset + 2] = rgb[2];
+    pixels.data[offset + 3] = 255;
+  };
+
+  const full = (data) => {
+    width = data.width;
+    height = data.height;
+    raster.width = width;
+    raster.height = height;
+    pixels = rasterContext.createImageData(width, height);
+    colors = data.palette.map((entry) => parseColor(entry.Color));
+    images = data.palette.map((entry) => loadImage(entry.Image));
+    codes = Uint8Array.from(atob(data.codes), (c) => c.charCodeAt(0));
+    for (let cell = 0; cell < codes.length; cell++) paint(cell);
+  };
+
+  const delta = (data) => {
+    for (let i = 0; i < data.cells.length; i++) {
+      codes[data.cells[i]] = data.codes[i];
+      paint(data.cells[i]);
+    }
+  };
+
+  const drawImages = (cellWidth, cellHeight) => {
+    for (let cell = 0; cell < codes.length; cell++) {
+      const image = images[codes[cell]];
+      if (image && image.complete && image.naturalWidth) {
+        const x = Math.floor(cell / height);
+        const y = cell % height;
+        context.drawImage(image, x * cellWidth, (height - 1 - y) * cellHeight, cellWidth, cellHeight);
+      }
+    }
+  };
+
+  const drawCircle = (x, y, radius, color, cellWidth, cellHeight) => {
+    const maxR = Math.min(cellWidth, cellHeight) / 2 - 1;
+    context.beginPath();
+    context.arc((x + 0.5) * cellWidth, (height - y - 0.5) * cellHeight, Math.max(radius * maxR, 1), 0, Math.PI * 2);
+    context.fillStyle = color;
+    context.fill();
+  };
+
+  this.render = (data) => {
+    if (data.type === "full") full(data);
+    else if (codes) delta(data);
+    else return;
+
+    rasterContext.putImageData(pixels, 0, 0);
+    context.imageSmoothingEnabled = false;
+    context.clearRect(0, 0, canvas_width, canvas_height);
+    context.drawImage(raster, 0, 0, canvas_width, canvas_height);
+
+    const cellWidth = canvas_width / width;
+    const cellHeight = canvas_height / height;
+    if (Math.min(cellWidth, cellHeight) >= MIN_IMAGE_CELL) drawImages(cellWidth, cellHeight);
+    for (const [x, y] of data.firemen) drawCircle(x, y, 0.5, overlay_colors.Fireman, cellWidth, cellHeight);
+    for (const [x, y, r, heavy] of data.clouds) {
+      drawCircle(x, y, r, heavy ? overlay_colors["heavy cloud"] : overlay_colors.Cloud, cellWidth, cellHeight);
+    }
+  };
+
+  this.reset = () => {
+    codes = null;
+    context.clearRect(0, 0, canvas_width, canvas_height);
+  };
+};
@@ -1,4 +1,6 @@
+import math
 import random
+import numpy as np
 from typing import Literal, Callable
 
 class Stats():
@@ -16,21 +18,30 @@ class Stats():
             - standart_deviation (float)
                 Desvio padrão
             - sort_value (Callable) (opcional)
-                Função para sorteio de um valor
+                Função para sorteio de um valor, que recebe o gerador aleatório (random.Random)
         '''
         self.mean_value = mean_value
         self.standard_deviation = standard_deviation
         self.type = type
         self.sort_value = sort_value if sort_value else self.default_sort_value
         
-    def default_sort_value(self):
+    def default_sort_value(self, rng: random.Random):
         '''
         Sorteia um número que respeite o valor médio e variância.
+
+        Params:
+            - rng (random.Random)
+                Gerador usado no sorteio, o `random` do modelo, para que a simulação seja reprodutível
         
         Returns:
             - value (self.type): Valor sorteado
         '''
-        value = random.normalvariate(self.mean_value, self.standard_deviation)
+        return self._convert(rng.normalvariate(self.mean_value, self.standard_deviation))
+
+    def _convert(self, value: float):
+        '''
+        Converte um valor sorteado para o tipo da estatística.
+        '''
         if self.type == "float":
             return value
         if self.type == "int":
@@ -40,3 +51,58 @@ class Stats():
             # removendo o prefixo "0x" e preenchendo com zeros à esquerda se necessário.
             return "#"+hex(max(0, min(0xFFFFFFFF, int(value))))[2:].zfill(8).upper()
         
+
+    def sample(self, rng, n: int):
+        '''
+        Sorteia `n` valores de uma vez com um gerador do NumPy.
+        Se uma função de sorteio própria foi informada, ela é chamada `n` vezes com um
+        `random.Random` semeado pelo gerador.
+
+        Params:
+            - rng (np.random.Generator)
+                Gerador usado no sorteio
+            - n (int)
+                Quantidade de valores
+
+        Returns:
+            - values (np.ndarray): Valores sorteados
+        '''
+        if self.sort_value != self.default_sort_value:
+            py_rng = random.Random(int(rng.integers(2**63)))
+            return np.array([self.sort_value(py_rng) for _ in range(n)])
+        values = rng.normal(self.mean_value, self.standard_deviation, n)
+        if self.type == "int":
+            return np.rint(values).astype(int)
+        if self.type == "hex":
+            return np.array([self._convert(value) for value in values])
+        return values
+
+
+class ExactSum():
+    '''
+    Soma de floats mantida sem erro de arredondamento, para totais que recebem muitas variações
+    (+x e depois -x se cancelam exatamente). Guarda a soma como parciais que não se sobrepõem
+    (algoritmo de Shewchuk, o mesmo de `math.fsum`), e `value` é igual a `math.fsum` dos valores somados.
+    '''
+
+    def __init__(self):
+        self.partials = []
+
+    def add(self, x: float):
+        '''Soma `x` ao total.'''
+        i = 0
+        for y in self.partials:
+            if abs(x) < abs(y):
+                x, y = y, x
+            hi = x + y
+            lo = y - (hi - x)
+            if lo:
+                self.partials[i] = lo
+                i += 1
+            x = hi
+        self.partials[i:] = [x]
+
+    @property
+    def value(self):
+        '''Total arredondado corretamente para um float.'''
+        return math.fsum(self.partials)
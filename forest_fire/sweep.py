@@ -0,0 +1,330 @@
+'''
+Varredura de parâmetros em paralelo, com gravação incremental dos resultados.
+
+Cada execução (uma combinação de parâmetros com uma semente) roda num processo do pool e devolve
+as colunas coletadas pelo `datacollector`. O processo principal junta as execuções em blocos de
+`chunk_size` e grava cada bloco num arquivo `.npz` (uma array por coluna) assim que ele fecha,
+então a memória usada não depende do tamanho da varredura.
+
+O arquivo `runs.txt` do diretório de saída lista as execuções já gravadas. Ao rodar a mesma
+varredura de novo, por exemplo depois de uma interrupção, essas execuções são puladas.
+
+Com `cache_dir`, os resultados de cada execução também ficam no cache em disco (ver cache.py),
+que é compartilhado entre varreduras: execuções já feitas em outra varredura não são refeitas.
+
+Com `ensemble` (só no motor "array"), as iterações de cada combinação rodam juntas num
+`ForestFireEnsemble` (ver ensemble.py), numa única tarefa. Os dados de cada iteração são os mesmos
+do `ForestFireArray` com a sua semente, então as execuções gravadas e o cache são compartilhados
+com as varreduras sem `ensemble`.
+
+Uso:
+    python -m forest_fire.sweep saida --param biome_name=Cerrado,Caatinga --param tree_density=0.3,0.6 \
+        --iterations 10 --steps 100 --processes 4
+'''
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+from forest_fire.seeds import child_seeds
+
+MANIFEST = "runs.txt"
+
+
+def expand_grid(parameters: dict):
+    '''
+    Gera todas as combinações de parâmetros. Valores que são listas, tuplas ou ranges são varridos;
+    os demais são fixos.
+
+    Returns:
+        - combinations (list[dict])
+    '''
+    names = list(parameters)
+    values = [v if isinstance(v, (list, tuple, range)) else [v] for v in parameters.values()]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def run_key(engine: str, kwargs: dict, max_steps: int, data_collection_period: int, reporters=None,
+            stop_when_extinguished: bool = False):
+    '''
+    Identificador estável de uma execução, usado para pular execuções já gravadas.
+    '''
+    options = [engine, kwargs, max_steps, data_collection_period]
+    # As opções novas só entram na chave quando usadas, para manter as chaves das varreduras já gravadas
+    if reporters is not None or stop_when_extinguished:
+        options += [reporters, stop_when_extinguished]
+    description = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+def run_model(engine: str, kwargs: dict, max_steps: int, data_collection_period: int = 1, reporters=None,
+              stop_when_extinguished: bool = False, cache_dir=None):
+    '''
+    Roda uma execução sem visualização (ver headless.py) e devolve os dados coletados a cada
+    `data_collection_period` passos, sempre incluindo o último (<= 0: só o último).
+    Com `cache_dir`, o resultado vem do cache em disco quando já existe (ver cache.py).
+
+    Returns:
+        - columns (dict[str, list]): "Step" e uma coluna por reporter do `datacollector`
+    '''
+    options = dict(collect_every=max(data_collection_period, 0), reporters=reporters,
+                   stop_when_extinguished=stop_when_extinguished)
+    if cache_dir is not None:
+        from forest_fire.cache import ResultCache
+
+        data = ResultCache(cache_dir).run(engine, kwargs, max_steps, **options)
+    else:
+        from forest_fire.engines import ENGINES
+
+        data = ENGINES[engine](**kwargs).run(max_steps, **options)
+    return _columns(data)
+
+
+def run_ensemble(kwargs: dict, seeds, max_steps: int, data_collection_period: int = 1, reporters=None,
+                 stop_when_extinguished: bool = False, cache_dir=None):
+    '''
+    Roda as execuções de uma combinação de parâmetros, uma por semente de `seeds`, juntas num
+    `ForestFireEnsemble` (ver ensemble.py). Com `cache_dir`, só as sementes que não estão no cache
+    são rodadas.
+
+    Returns:
+        - runs (list[dict[str, list]]): As colunas de cada semente, como em `run_model`
+    '''
+    from forest_fire.ensemble import ForestFireEnsemble
+
+    options = dict(collect_every=max(data_collection_period, 0), reporters=reporters,
+                   stop_when_extinguished=stop_when_extinguished)
+    results = [None] * len(seeds)
+    if cache_dir is not None:
+        from forest_fire.cache import ResultCache, cache_key
+
+        cache = ResultCache(cache_dir)
+        keys = [cache_key("array", {**kwargs, "seed": seed}, max_steps, **options) for seed in seeds]
+        results = [cache.get(key) for key in keys]
+
+    missing = [i for i, data in enumerate(results) if data is None]
+    if missing:
+        data = ForestFireEnsemble(seeds=[seeds[i] for i in missing], **kwargs).run(max_steps, **options)
+        for replica, i in enumerate(missing):
+            results[i] = data.xs(replica, level="Replica")
+            if cache_dir is not None:
+                cache.put(keys[i], results[i])
+    return [_columns(data) for data in results]
+
+
+def _columns(data):
+    columns = {"Step": data.index.tolist()}
+    for name in data.columns:
+        columns[name] = data[name].tolist()
+    return columns
+
+
+def _run(task):
+    key, iteration, engine, kwargs, max_steps, data_collection_period, reporters, stop_when_extinguished, cache_dir = task
+    return [(key, iteration, kwargs, run_model(engine, kwargs, max_steps, data_collection_period, reporters,
+                                               stop_when_extinguished, cache_dir))]
+
+
+def _run_ensemble(task):
+    keys, iterations, kwargs, seeds, max_steps, data_collection_period, reporters, stop_when_extinguished, cache_dir = task
+    runs = run_ensemble(kwargs, seeds, max_steps, data_collection_period, reporters, stop_when_extinguished, cache_dir)
+    return [(key, iteration, {**kwargs, "seed": seed}, columns)
+            for key, iteration, seed, columns in zip(keys, iterations, seeds, runs)]
+
+
+class ChunkWriter:
+    '''
+    Junta execuções em memória e grava um bloco `chunk-NNNNN.npz` a cada `chunk_size` execuções.
+    '''
+
+    def __init__(self, output: str, chunk_size: int = 50):
+        self.output = output
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.keys = []
+        self.chunk_index = len([name for name in os.listdir(output) if name.startswith("chunk-")])
+
+    def add(self, key: str, iteration: int, kwargs: dict, columns: dict):
+        n = len(columns["Step"])
+        row = {"RunKey": [key] * n, "iteration": [iteration] * n}
+        row.update({name: [value] * n for name, value in kwargs.items()})
+        row.update(columns)
+        self.rows.append(row)
+        self.keys.append(key)
+        if len(self.keys) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.keys:
+            return
+        names = list(dict.fromkeys(name for row in self.rows for name in row))
+        arrays = {}
+        for name in names:
+            values = list(itertools.chain.from_iterable(
+                row.get(name, [None] * len(row["Step"])) for row in self.rows))
+            array = np.asarray(values)
+            # Colunas de tipos mistos são gravadas como texto, para não depender de pickle
+            arrays[name] = array.astype(str) if array.dtype == object else array
+
+        path = os.path.join(self.output, f"chunk-{self.chunk_index:05d}.npz")
+        np.savez(path, **arrays)
+        # O manifesto só é atualizado depois que o bloco foi gravado por completo
+        with open(os.path.join(self.output, MANIFEST), "a") as manifest:
+            manifest.writelines(key + "\n" for key in self.keys)
+
+        self.chunk_index += 1
+        self.rows = []
+        self.keys = []
+
+
+def completed_runs(output: str):
+    '''Execuções já gravadas no diretório de saída.'''
+    path = os.path.join(output, MANIFEST)
+    if not os.path.exists(path):
+        return set()
+    with open(path) as manifest:
+        return {line.strip() for line in manifest if line.strip()}
+
+
+def sweep(parameters: dict, output: str, engine: str = "agents", iterations: int = 1, seed=42,
+          max_steps: int = 100, data_collection_period: int = 1, processes=None, chunk_size: int = 50,
+          reporters=None, stop_when_extinguished: bool = False, cache_dir=None, ensemble: bool = False):
+    '''
+    Roda a varredura de parâmetros, gravando os resultados em blocos no diretório `output`.
+
+    Params:
+        - parameters (dict)
+            Parâmetros do modelo; listas, tuplas e ranges são varridos
+        - output (str)
+            Diretório de saída
+        - engine ("agents" | "array")
+            Motor de simulação (ver engines.py)
+        - iterations (int)
+            Execuções por combinação, cada uma com uma semente filha de `seed`
+            (ignorado se `parameters` já tiver "seed")
+        - max_steps (int)
+            Número de passos de cada execução
+        - data_collection_period (int)
+            Grava os dados a cada tantos passos (<= 0: só o último passo)
+        - processes (int | None)
+            Número de processos (None: todos os processadores)
+        - chunk_size (int)
+            Execuções por bloco gravado
+        - reporters (list[str] | None)
+            Colunas gravadas (None: todas)
+        - stop_when_extinguished (bool)
+            Termina cada execução assim que o fogo acaba
+        - cache_dir (str | None)
+            Diretório do cache de resultados (None: sem cache)
+        - ensemble (bool)
+            Roda as iterações de cada combinação juntas num `ForestFireEnsemble` (só no motor "array")
+
+    Returns:
+        - n_runs (int): Número de execuções feitas nesta chamada
+    '''
+    if ensemble and (engine != "array" or "seed" in parameters):
+        raise ValueError("O modo ensemble só roda o motor 'array', com as sementes geradas pelas iterações")
+    os.makedirs(output, exist_ok=True)
+    done = completed_runs(output)
+
+    tasks = []
+    seeds = child_seeds(seed, iterations) if "seed" not in parameters else [None]
+    for kwargs in expand_grid(parameters):
+        pending = []
+        for iteration, run_seed in enumerate(seeds):
+            run_kwargs = dict(kwargs) if run_seed is None else {**kwargs, "seed": run_seed}
+            key = run_key(engine, run_kwargs, max_steps, data_collection_period, reporters, stop_when_extinguished)
+            if key not in done:
+                pending.append((key, iteration, run_seed, run_kwargs))
+        if ensemble and pending:
+            keys, run_iterations, run_seeds, _ = zip(*pending)
+            tasks.append((list(keys), list(run_iterations), kwargs, list(run_seeds), max_steps,
+                          data_collection_period, reporters, stop_when_extinguished, cache_dir))
+        elif not ensemble:
+            tasks.extend((key, iteration, engine, run_kwargs, max_steps, data_collection_period, reporters,
+                          stop_when_extinguished, cache_dir) for key, iteration, _, run_kwargs in pending)
+
+    run = _run_ensemble if ensemble else _run
+    writer = ChunkWriter(output, chunk_size)
+    n_runs = 0
+    try:
+        if processes == 1:
+            for runs in map(run, tasks):
+                for result in runs:
+                    writer.add(*result)
+                n_runs += len(runs)
+        else:
+            with Pool(processes) as pool:
+                for runs in pool.imap_unordered(run, tasks):
+                    for result in runs:
+                        writer.add(*result)
+                    n_runs += len(runs)
+    finally:
+        writer.flush()
+    return n_runs
+
+
+def load(output: str):
+    '''
+    Lê todos os blocos de uma varredura num único DataFrame do pandas.
+    '''
+    import pandas as pd
+
+    chunks = sorted(name for name in os.listdir(output) if name.startswith("chunk-"))
+    frames = []
+    for name in chunks:
+        with np.load(os.path.join(output, name)) as data:
+            frames.append(pd.DataFrame({column: data[column] for column in data.files}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _parse_value(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros do ForestFire em paralelo.")
+    parser.add_argument("output", help="Diretório de saída")
+    parser.add_argument("--param", action="append", default=[], metavar="NOME=V1,V2,...",
+                        help="Parâmetro do modelo e seus valores (pode repetir)")
+    parser.add_argument("--params", help="Arquivo JSON com os parâmetros")
+    parser.add_argument("--engine", default="agents", choices=["agents", "array"])
+    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--period", type=int, default=1, help="Grava os dados a cada tantos passos")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--reporters", nargs="+", default=None, help="Colunas gravadas (padrão: todas)")
+    parser.add_argument("--stop-when-extinguished", action="store_true", help="Termina as execuções quando o fogo acaba")
+    parser.add_argument("--cache", default=None, metavar="DIR", help="Diretório do cache de resultados (ver cache.py)")
+    parser.add_argument("--ensemble", action="store_true",
+                        help="Roda as iterações de cada combinação juntas (motor array, ver ensemble.py)")
+    args = parser.parse_args(argv)
+
+    parameters = {}
+    if args.params:
+        with open(args.params) as f:
+            parameters.update(json.load(f))
+    for item in args.param:
+        name, _, values = item.partition("=")
+        values = [_parse_value(v) for v in values.split(",")]
+        parameters[name] = values if len(values) > 1 else values[0]
+    parameters.setdefault("biome_name", "Default")
+
+    n_runs = sweep(parameters, args.output, args.engine, args.iterations, args.seed, args.steps,
+                   args.period, args.processes, args.chunk_size, args.reporters, args.stop_when_extinguished, args.cache,
+                   args.ensemble)
+    print(f"{n_runs} execuções gravadas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+'''
+Decomposição do grid do `ForestFireArray` em faixas (tiles) avançadas em paralelo, para paisagens
+muito grandes (ver o parâmetro `tiles` do modelo).
+
+O grid é dividido em faixas de linhas x inteiras, uma por processo. Os arrays de estado ficam em
+memória compartilhada: o processo principal e os processos das faixas usam os mesmos dados.
+Em cada fase, o processo de uma faixa copia as suas linhas e um halo das faixas vizinhas, com a
+profundidade da vizinhança de que a fase depende, calcula a fase na cópia e escreve de volta só as
+suas linhas. Uma barreira entre a cópia e a escrita garante que todas as faixas leiam o estado
+anterior à fase. Profundidade do halo:
+    - fogo: 1 célula do vento, mais `corridor_radius` + 2 dos corredores (lago, vizinha, corredor);
+    - reprodução: 4 células, as 2 da vizinhança de `Tree.search_neighbours` das árvores que se
+      reproduzem, que também dependem das árvores a 2 células delas.
+
+Os sorteios continuam sendo feitos pelo gerador do modelo, no processo principal e na mesma ordem
+da execução num só processo, e ficam num buffer compartilhado. Como as faixas são linhas x
+inteiras, a ordem das células faixa a faixa é a mesma do grid inteiro, então os tamanhos das
+árvores novas também são distribuídos na mesma ordem. O resultado é igual ao de `tiles=1`.
+
+Nuvens (e a chuva), bombeiros, focos aleatórios, clusters e a coleta de dados, que são poucos ou
+sequenciais, rodam no processo principal, direto nos arrays compartilhados.
+'''
+
+import multiprocessing
+import weakref
+
+import numpy as np
+
+from forest_fire import spread
+from forest_fire.landscape import EMPTY, FINE, BURNING
+from forest_fire.neighbourhood import FIRST_LEVEL_DIRECTIONS, SECOND_LEVEL_DIRECTIONS
+
+# Arrays (width, height) do modelo alterados pelas faixas, guardados em memória compartilhada
+SHARED_ARRAYS = ("terrain", "status", "size", "CO2_emission")
+# Profundidade do halo da reprodução
+REPRODUCTION_HALO = 4
+
+
+def fire_halo(corridor_radius: int, wind: bool):
+    '''Profundidade do halo da propagação do fogo, com ou sem o vento.'''
+    return corridor_radius + 2 + (1 if wind else 0)
+
+
+class SharedDraws:
+    '''Gerador de mentira que devolve os sorteios uniformes já feitos pelo processo principal.'''
+
+    def __init__(self, values):
+        self.values = values
+
+    def random(self, shape):
+        return self.values
+
+
+class Tile:
+    '''
+    As linhas [x0, x1) do grid, no processo da faixa.
+
+    Params:
+        - arrays (dict[str, np.ndarray])
+            Arrays compartilhados, incluindo "draws", os sorteios do processo principal
+        - barrier (multiprocessing.Barrier)
+            Barreira de todas as faixas
+        - settings (dict)
+            Parâmetros do modelo usados nas fases
+    '''
+
+    def __init__(self, arrays: dict, barrier, settings: dict, x0: int, x1: int):
+        self.arrays = arrays
+        self.barrier = barrier
+        self.settings = settings
+        self.x0, self.x1 = x0, x1
+        self.width, self.height = settings["shape"]
+        self.reproduction = None  # Estado copiado para a reprodução e as árvores que se reproduzem
+        self.grown = None  # Máscara das árvores novas das linhas da faixa
+
+        # Número de vizinhos dentro do grid, na janela da reprodução
+        lo, hi = self._window(REPRODUCTION_HALO)
+        ones = np.ones((hi - lo, self.height))
+        self.n_first_level = spread.neighbor_sum(ones, FIRST_LEVEL_DIRECTIONS)
+        self.n_second_level = spread.neighbor_sum(ones, SECOND_LEVEL_DIRECTIONS)
+
+    def _window(self, halo: int):
+        '''Linhas [lo, hi) da faixa com o halo, dentro do grid.'''
+        return max(self.x0 - halo, 0), min(self.x1 + halo, self.width)
+
+    def _copy(self, names, lo: int, hi: int):
+        return [self.arrays[name][lo:hi].copy() for name in names]
+
+    def fire(self, wind: bool):
+        '''
+        Propagação do fogo (com o vento, se `wind`) nas linhas da faixa. Depois que todas as faixas
+        escreveram o estado novo, procura as árvores que vão se reproduzir.
+
+        Returns:
+            - sources (bool): Se alguma árvore da faixa vai se reproduzir
+        '''
+        settings = self.settings
+        lo, hi = self._window(fire_halo(settings["corridor_radius"], wind))
+        status, terrain, CO2_emission = self._copy(("status", "terrain", "CO2_emission"), lo, hi)
+        size = self.arrays["size"][lo:hi]  # Só lido nesta fase
+        self.barrier.wait()  # Todas as faixas copiaram o seu halo
+
+        if wind:
+            spread.wind_spread(status, size, CO2_emission, settings["wind_vector"], settings["wind_intensity"],
+                               SharedDraws(self.arrays["draws"][lo:hi]))
+        spread.spread(status, terrain, size, CO2_emission, settings["corridor_radius"])
+
+        own = slice(self.x0 - lo, self.x1 - lo)
+        for name, local in (("status", status), ("terrain", terrain), ("CO2_emission", CO2_emission)):
+            self.arrays[name][self.x0:self.x1] = local[own]
+        self.barrier.wait()  # Todas as faixas escreveram o estado novo
+
+        lo, hi = self._window(REPRODUCTION_HALO)
+        status, terrain = self._copy(("status", "terrain"), lo, hi)
+        t1, t2, sources = spread.reproduction_sources(status, self.n_first_level, self.n_second_level,
+                                                      settings["tree_density"])
+        self.reproduction = (lo, status, terrain, t1, t2, sources)
+        return bool(sources[self.x0 - lo:self.x1 - lo].any())
+
+    def grow(self):
+        '''
+        Reprodução nas linhas da faixa, com os sorteios uniformes do grid inteiro em "draws".
+
+        Returns:
+            - count (int): Número de árvores novas na faixa
+        '''
+        settings = self.settings
+        lo, status, terrain, t1, t2, sources = self.reproduction
+        grow, cleared = spread.regrowth(status, terrain, self.n_first_level, self.n_second_level, t1, t2, sources,
+                                        settings["tree_density"], settings["reprod_speed"],
+                                        self.arrays["draws"][lo:lo + len(status)])
+        own = slice(self.x0 - lo, self.x1 - lo)
+        grow, cleared = grow[own], cleared[own]
+
+        status, size, CO2_emission = (self.arrays[name][self.x0:self.x1] for name in ("status", "size", "CO2_emission"))
+        status[cleared] = EMPTY
+        size[cleared] = 0
+        CO2_emission[cleared | grow] = 0
+        status[grow] = FINE
+        self.grown = grow
+        self.reproduction = None
+        return int(np.count_nonzero(grow))
+
+    def sizes(self, offset: int):
+        '''Tamanhos das árvores novas da faixa, a partir da posição `offset` dos sorteios em "draws".'''
+        values = self.arrays["draws"].ravel()[offset:offset + np.count_nonzero(self.grown)]
+        self.arrays["size"][self.x0:self.x1][self.grown] = values
+
+
+def _tile_worker(connection, barrier, buffers: dict, settings: dict, x0: int, x1: int):
+    '''Processo de uma faixa: executa os comandos do `TilePool` até receber "close".'''
+    arrays = {name: np.frombuffer(buffer, dtype=dtype).reshape(settings["shape"])
+              for name, (buffer, dtype) in buffers.items()}
+    tile = Tile(arrays, barrier, settings, x0, x1)
+    while True:
+        command, *args = connection.recv()
+        if command == "close":
+            break
+        try:
+            result = getattr(tile, command)(*args)
+        except Exception as error:
+            barrier.abort()  # As demais faixas não ficam esperando esta
+            result = error
+        connection.send(result)
+    connection.close()
+
+
+def _shutdown(connections, workers):
+    for connection in connections:
+        try:
+            connection.send(("close",))
+        except (BrokenPipeError, OSError):
+            pass
+    for worker in workers:
+        worker.join(timeout=5)
+        if worker.is_alive():
+            worker.terminate()
+
+
+class TilePool:
+    '''
+    Processos das faixas de um `ForestFireArray`. Ao ser criado, passa os arrays de estado do modelo
+    para a memória compartilhada (os atributos do modelo passam a apontar para eles).
+
+    Params:
+        - model (ForestFireArray)
+        - n_tiles (int)
+            Número de faixas (e de processos), no máximo uma por linha x
+    '''
+
+    def __init__(self, model, n_tiles: int):
+        context = multiprocessing.get_context()
+        shape = (model.width, model.height)
+        n_tiles = max(1, min(n_tiles, model.width))
+        bounds = np.linspace(0, model.width, n_tiles + 1).astype(int)
+
+        buffers = {}
+        for name in SHARED_ARRAYS + ("draws",):
+            dtype = np.dtype(np.float64) if name == "draws" else getattr(model, name).dtype
+            buffer = context.RawArray("b", int(np.prod(shape)) * dtype.itemsize)
+            buffers[name] = (buffer, dtype.str)
+            shared = np.frombuffer(buffer, dtype=dtype).reshape(shape)
+            if name == "draws":
+                self.draws = shared
+            else:
+                shared[...] = getattr(model, name)
+                setattr(model, name, shared)
+        self.status = model.status
+
+        settings = {"shape": shape, "corridor_radius": model.corridor_radius, "wind_vector": model._get_wind_vector(),
+                    "wind_intensity": model.wind_intensity, "tree_density": model.tree_density,
+                    "reprod_speed": model.reprod_speed}
+        barrier = context.Barrier(n_tiles)
+        self.connections, self.workers = [], []
+        for x0, x1 in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            connection, child = context.Pipe()
+            worker = context.Process(target=_tile_worker, args=(child, barrier, buffers, settings, x0, x1), daemon=True)
+            worker.start()
+            child.close()
+            self.connections.append(connection)
+            self.workers.append(worker)
+        self._finalizer = weakref.finalize(self, _shutdown, self.connections, self.workers)
+
+        self.wind = False  # Se os sorteios do vento deste passo já estão em "draws"
+        self.sources = False  # Se alguma árvore vai se reproduzir neste passo
+
+    def __len__(self):
+        return len(self.workers)
+
+    def _broadcast(self, *command):
+        for connection in self.connections:
+            connection.send(command)
+        return self._results()
+
+    def _results(self):
+        results = [connection.recv() for connection in self.connections]
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise RuntimeError("Erro num processo das faixas") from errors[0]
+        return results
+
+    def propagate_fire(self, rng):
+        '''Sorteios do vento, feitos como em `spread.wind_spread` (só se há fogo).'''
+        self.wind = bool((self.status == BURNING).any())
+        if self.wind:
+            rng.random(out=self.draws)
+
+    def spread_fire(self):
+        '''Propagação do fogo em todas as faixas (com o vento, se `propagate_fire` foi chamado).'''
+        self.sources = any(self._broadcast("fire", self.wind))
+        self.wind = False
+
+    def reproduce(self, rng, size_stats):
+        '''
+        Reprodução em todas as faixas, com os mesmos sorteios de `ForestFireArray.reproduce`:
+        um uniforme por célula e os tamanhos das árvores novas, na ordem das células.
+        '''
+        if not self.sources:
+            return
+        rng.random(out=self.draws)
+        counts = self._broadcast("grow")
+        total = sum(counts)
+        self.draws.ravel()[:total] = size_stats.sample(rng, total)
+        offsets = np.cumsum([0] + counts[:-1]).tolist()
+        for connection, offset in zip(self.connections, offsets):
+            connection.send(("sizes", offset))
+        self._results()
+
+    def close(self):
+        '''Encerra os processos das faixas.'''
+        self._finalizer()
@@ -1,8 +1,24 @@
-import mesa
-import random
+import numpy as np
+from forest_fire.agent import CellAgent
+from forest_fire.obstacles import Lake
+from forest_fire.layers import VEGETATION
+from forest_fire.landscape import FINE, BURNING, BURNED, STATUS_NAMES
 
-from forest_fire.obstacles import Lake, Corridor, Obstacle, Puddle
-from forest_fire.ground import Terra
+STATUS_CODES = {name: code for code, name in STATUS_NAMES.items()}
+
+# Tamanho máximo de cada classe de tamanho da árvore e a imagem de cada classe
+SIZE_CLASSES = (8, 15, 30, 40)
+TREE_IMAGES = (
+    'arvore1.png',  # Imagem para árvores bem pequenas
+    'arvore2.png',  # Imagem para árvores pequenas
+    'arvore3.png',  # Imagem para árvores média
+    'arvore4.png',  # Imagem para árvores grandes
+    'arvore5.png',  # Imagem para árvores bem grandes
+)
+
+def size_class(size):
+    """Classe de tamanho (índice em `TREE_IMAGES`) de uma árvore; aceita também arrays de tamanhos."""
+    return np.searchsorted(SIZE_CLASSES, size, side="left")
 
 # Dicionário de cores para cada status da árvore
 COLORS = {
@@ -11,117 +27,131 @@ COLORS = {
     "Burned": "#3D2B1F",    # Cor para árvores queimadas (marrom escuro)
 }
                 
-class Tree(mesa.Agent):
+class Tree(CellAgent):
     """
     A árvore é um agente que pode ter diferentes estados, como 'Fine', 'Burning' ou 'Burned'.
     Ela também tem uma imagem que depende do seu tamanho.
+
+    O status é guardado como o código inteiro de `landscape` (FINE, BURNING, BURNED) e lido como
+    texto. Cor, diretório das imagens, densidade e velocidade de reprodução são os do modelo.
     """
-    def __init__(self, unique_id, model, pos, size: float, color: str, tree_density, img_path: str = None, reprod_speed=1):
+    __slots__ = ("_status", "reproducing", "size", "_CO2_emission", "_CO2_sequestered")
+    layer = VEGETATION
+    burnable = True
+
+    def __init__(self, unique_id, model, pos, size: float):
         super().__init__(unique_id, model)
         self.pos = pos
-        self.status = "Fine"  # Status inicial da árvore
+        self._status = FINE  # Status inicial da árvore
+        self.reproducing = False # Se a árvore ainda tenta crescer árvores ao redor
+        self.size = size
+        self._CO2_emission = 0
+        self._CO2_sequestered = 0
+
+    @property
+    def status(self):
+        return STATUS_NAMES[self._status]
+
+    @status.setter
+    def status(self, status):
+        """Avisa o modelo de toda mudança de status, para manter a fronteira do fogo atualizada."""
+        old_status = self._status
+        self._status = STATUS_CODES[status]
+        if old_status != self._status:
+            self.model.tree_status_changed(self, STATUS_NAMES[old_status])
+
+    @property
+    def color(self):
+        return self.model.biome.tree_color # Cor da árvore, vinda do bioma
+
+    @property
+    def img_path(self):
+        return self.model.biome.img_path
+
+    @property
+    def tree_density(self):
+        return self.model.tree_density
+
+    @property
+    def reprod_speed(self):
+        return self.model.reprod_speed
+
+    @property
+    def CO2_emission(self):
+        return self._CO2_emission
+
+    @CO2_emission.setter
+    def CO2_emission(self, value):
+        """Avisa o modelo da variação, para manter o total de CO2 atualizado."""
+        self.model.tree_CO2_changed(value - self._CO2_emission, 0)
+        self._CO2_emission = value
+
+    @property
+    def CO2_sequestered(self):
+        return self._CO2_sequestered
+
+    @CO2_sequestered.setter
+    def CO2_sequestered(self, value):
+        self.model.tree_CO2_changed(0, value - self._CO2_sequestered)
+        self._CO2_sequestered = value
+
+    @property
+    def active(self):
+        """Se a árvore precisa ser ativada de novo no próximo passo."""
+        return self._status == BURNING or (self._status == FINE and self.reproducing)
+        
+    def regrow(self, size: float):
+        """Replanta no lugar a árvore queimada: volta a ser saudável, com um novo tamanho e sem CO2."""
         self.size = size
-        self.color = color # Cor da árvore, geralmente vinda do bioma
-        self.burnable = True
-        self.img_path = img_path
-        self.tree_density = tree_density
-        self.reprod_speed = reprod_speed
+        self.reproducing = False
         self.CO2_emission = 0
         self.CO2_sequestered = 0
-        
+        self.status = "Fine"
+
     def remove_burned_tree(self, burned_tree):
-        self.model.grid.remove_agent(burned_tree)
-        self.model.schedule.remove(burned_tree)
+        # A árvore queimada vira terra no fim do passo (ver `ForestFire.regrow`)
+        self.model.queue_regrowth(burned_tree, grow=False)
     
     def grow_tree(self, growable_agent):
-        pos = growable_agent.pos
-        if isinstance(growable_agent, Tree):                
-            growable_agent.CO2_sequestered += growable_agent.size * 0.1  #  Sequestra 0.1kg de CO2 por unidade de tamanho
-        if not isinstance(growable_agent, Terra) and growable_agent.status != "Fireman":
-            self.model.grid.remove_agent(growable_agent)
-            self.model.schedule.remove(growable_agent)
-        size = self.model.biome.size.sort_value()
-        color = self.model.biome.tree_color
-        tree = Tree(self.model.next_id(), self.model, pos, size, color, self.model.tree_density, self.model.biome.img_path, self.model.reprod_speed)
-        self.model.grid.place_agent(tree, pos)
-        self.model.schedule.add(tree)
-        self.model.num_fine_trees += 1
+        # Uma árvore nova cresce na célula no fim do passo (ver `ForestFire.regrow`)
+        self.model.queue_regrowth(growable_agent)
         
     def search_neighbours(self, pos):
-        x, y = pos
-        first_level_directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        second_level_directions = [(-2, 0), (2, 0), (0, -2), (0, 2), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        
-        n_first_level_neighbors = 0
-        n_second_level_neighbors = 0
-        n_first_level_trees = 0
-        n_second_level_trees = 0
-        
-        for d1 in first_level_directions:
-            dx, dy = d1
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.model.width and 0 <= ny < self.model.height:
-                n_first_level_neighbors += 1
-                cell_agents = self.model.grid.get_cell_list_contents([(nx, ny)])
-                for agent in cell_agents:
-                    if isinstance(agent, Tree) and agent.status == 'Fine':
-                        n_first_level_trees += 1
-                        break # Só existe uma árvore por célula
-        
-        for d2 in second_level_directions:
-            dx, dy = d2
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.model.width and 0 <= ny < self.model.height:
-                n_second_level_neighbors += 1
-                cell_agents = self.model.grid.get_cell_list_contents([(nx, ny)])
-                for agent in cell_agents:
-                    if isinstance(agent, Tree) and agent.status == 'Fine':
-                        n_second_level_trees += 1
-                        break # Só existe uma árvore por célula
-        
-        return (n_first_level_neighbors, n_second_level_neighbors, n_first_level_trees, n_second_level_trees)
+        # Usa o índice de vizinhanças e o mapa de árvores saudáveis do modelo
+        return self.model.neighbourhood.count(pos, self.model.fine_trees)
     
     def grow_neighbour_trees(self, pos, n1_reprod_rate, n2_reprod_rate):
-        x, y = pos
-        first_level_directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        second_level_directions = [(-2, 0), (2, 0), (0, -2), (0, 2), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+        first_level, second_level = self.model.neighbourhood.levels(pos)
+        cells = self.model.cells
         
-        for d1 in first_level_directions:
-            dx, dy = d1
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.model.width and 0 <= ny < self.model.height:
-                cell_agents = self.model.grid.get_cell_list_contents([(nx, ny)])
+        for level, reprod_rate in ((first_level, n1_reprod_rate), (second_level, n2_reprod_rate)):
+            for cell in level:
+                # Só a terra, a árvore e o obstáculo da célula: nuvens e bombeiros não mudam a reprodução
+                cell_agents = [agent for agent in (cells.vegetation(cell), cells.obstacle(cell)) if agent is not None]
+                # A terra da célula vem antes dos agentes, como se fosse o primeiro agente da célula
+                if self.random.uniform(0, 1) < reprod_rate:
+                    ground = self.model.ground[cell]
+                    if self.can_grow(ground):
+                        self.grow_tree(ground)
                 for agent in cell_agents:
-                    if random.uniform(0, 1) < n1_reprod_rate and self.can_grow(agent):
+                    if self.random.uniform(0, 1) < reprod_rate and self.can_grow(agent):
                         self.grow_tree(agent)                
                     # Transforma todas as árvores vizinhas queimadas em terra
-                    elif isinstance(agent, Tree) and agent.status == 'Burned':
-                        self.remove_burned_tree(agent)
-        
-        for d2 in second_level_directions:
-            dx, dy = d2
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < self.model.width and 0 <= ny < self.model.height:
-                cell_agents = self.model.grid.get_cell_list_contents([(nx, ny)])
-                for agent in cell_agents:
-                    if random.uniform(0, 1) < n2_reprod_rate and self.can_grow(agent):
-                        self.grow_tree(agent)
-                    # Transforma todas as árvores vizinhas queimadas em terra
-                    elif isinstance(agent, Tree) and agent.status == 'Burned':
+                    elif isinstance(agent, Tree) and agent._status == BURNED:
                         self.remove_burned_tree(agent)
                         
 
     def can_grow(self, cord):
-        obstacles_in_cell = self.model.get_cell_items([cord.pos], [Obstacle, Corridor, Puddle, Lake, Tree])
-        no_obstacles = len(obstacles_in_cell) == 0 # Se não tem obstáculo, então só tem terra que pode crescer
-        if (isinstance(cord, Tree) and cord.status == 'Burned') or no_obstacles:
+        no_obstacles = not self.model.cells.occupied(cord.pos) # Se não tem árvore nem obstáculo, então só tem terra que pode crescer
+        if (isinstance(cord, Tree) and cord._status == BURNED) or no_obstacles:
             n_first_level_neighbors, n_second_level_neighbors, n_first_level_trees, n_second_level_trees = self.search_neighbours(cord.pos)
             # A escolha desse return se dá para tentar restringir as limitações de estarmos tratando com inteiros
             return (n_first_level_trees < n_first_level_neighbors * self.tree_density) and (n_second_level_trees < n_second_level_neighbors * self.tree_density)
         return False
 
     def tree_reproduction(self):
-        if self.status != 'Fine':
+        self.reproducing = False
+        if self._status != FINE:
             return
 
         n_first_level_neighbors, n_second_level_neighbors, n_first_level_trees, n_second_level_trees = self.search_neighbours(self.pos)            
@@ -131,6 +161,8 @@ class Tree(mesa.Agent):
         neighbors_number = n_first_level_neighbors + n_second_level_neighbors + 1 
         if (n_trees) >= self.tree_density * neighbors_number:
             return
+        # Enquanto estiver abaixo da densidade esperada, a árvore continua na fronteira
+        self.reproducing = self.reprod_speed > 0
         expected_trees = (neighbors_number * self.tree_density) - n_trees
         n1_reproduction_rate = (
             expected_trees/(n_first_level_neighbors * neighbors_number))*self.reprod_speed
@@ -143,7 +175,7 @@ class Tree(mesa.Agent):
         """
         A cada passo, a árvore pode pegar fogo e propagar o fogo para as árvores vizinhas.
         """
-        if self.status == "Burning":
+        if self._status == BURNING:
             for neighbor in self.model.grid.iter_neighbors(self.pos, moore=True):
                 if isinstance(neighbor, Lake):
                     self.status = "Burned"
@@ -152,13 +184,12 @@ class Tree(mesa.Agent):
             for neighbor in self.model.grid.iter_neighbors(self.pos, moore=True):
                 if neighbor.status == "Fine" and neighbor.burnable:
                     neighbor.status = "Burning"
-                    self.model.num_fine_trees -= 1
                 elif neighbor.status == "Corridor" and neighbor.burnable:
                     neighbor.status = "Burned"
+                    self.model.schedule.activate(neighbor) # O corredor queimado é removido no seu passo
                     for neighbor_c in self.model.grid.iter_neighbors(neighbor.pos, moore=True, radius=neighbor.radius):
                         if neighbor_c.status == "Fine" and neighbor_c.burnable:                          
                             neighbor_c.status = "Burning"
-                            self.model.num_fine_trees -= 1
         
              # Cálculo de CO2 emitido na queima da árvore
             self.CO2_emission = self.size * 20 * 0.5 * 3.67 # Biomassa x 0.5 x 3.67
@@ -175,20 +206,5 @@ class Tree(mesa.Agent):
         if not self.img_path:
             return None
         
-        if self.size <= 8:
-            img_file = 'arvore1.png'  # Imagem para árvores bem pequenas
-        elif self.size <= 15:
-            img_file = 'arvore2.png'  # Imagem para árvores pequenas
-        elif self.size <= 30:
-            img_file = 'arvore3.png'  # Imagem para árvores média
-        elif self.size <= 40:
-            img_file = 'arvore4.png'  # Imagem para árvores grandes
-        else:
-            img_file = 'arvore5.png'  # Imagem para árvores bem grandes
-
-        image= f"{self.img_path}/{img_file}"#self.model.biome.img_path
-
-        # Adicione um print para depurar
-        print(f"Image Path for Tree: {image}")  
-        
+        image = f"{self.img_path}/{TREE_IMAGES[size_class(self.size)]}"
         return image
\ No newline at end of file